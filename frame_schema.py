@@ -0,0 +1,111 @@
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Per-table dtype schema applied right after a Supabase/mirror load.
+# - category: low-cardinality text stored as pandas categoricals
+# - string:   free text stored as Arrow-backed strings
+# - datetime: parsed once here instead of in every chart
+# - numeric:  coerced to numbers, integers downcast to the smallest width
+# - clean_country: strip the "<region>, " prefix Google adds to country names
+TABLE_SCHEMAS = {
+    "brd_gtrends_geomap": {
+        "category": ["keyword", "region/state", "geo"],
+        "numeric": ["id", "interest"],
+    },
+    "brd_gtrends_multitimeline": {
+        "category": ["keyword", "geo"],
+        "string": ["time"],
+        "datetime": ["date"],
+        "numeric": ["id", "interest"],
+    },
+    "brd_gtrends_relatedqueries": {
+        "category": ["keyword", "category", "country", "geo"],
+        "string": ["relatedquery"],
+        "numeric": ["id", "interest", "searchfreqinc"],
+        "clean_country": True,
+    },
+    "brd_gtrends_relatedentities": {
+        "category": ["keyword", "category", "country", "geo"],
+        "string": ["relatedtopic"],
+        "numeric": ["id", "interest", "searchfreqinc"],
+        "clean_country": True,
+    },
+    "brd_outre_products": {
+        "category": ["category", "subcategory", "length"],
+        "string": ["name", "link", "product_description", "image_url"],
+        "datetime": ["modified", "date"],
+        "numeric": ["quantity"],
+    },
+}
+
+# Latest before/after memory footprint (bytes) per table, filled by normalize_frame
+MEMORY_REPORT = {}
+
+
+def clean_country(series):
+    """Vectorized form of re.sub(r'^.*?,\\s*', '', x): keep only the text after the first comma."""
+    return series.astype(str).str.replace(r"^.*?,\s*", "", regex=True)
+
+
+def url_basename(series):
+    """Vectorized os.path.basename(urlparse(x).path): the file name at the end of each URL."""
+    return series.str.extract(r"^(?:[A-Za-z][\w+.-]*:)?(?://[^/?#]*)?(?:[^?#]*/)?([^/?#]*)", expand=False)
+
+
+def _to_numeric(series):
+    converted = pd.to_numeric(series, errors="coerce")
+    if converted.isna().sum() != series.isna().sum():
+        return series  # not actually numeric; leave it untouched rather than lose values
+    if pd.api.types.is_integer_dtype(converted):
+        converted = pd.to_numeric(converted, downcast="integer")
+    return converted
+
+
+def _to_datetime(series):
+    converted = pd.to_datetime(series, errors="coerce", utc=True, format="ISO8601")
+    if converted.isna().sum() != series.isna().sum():
+        return series
+    return converted
+
+
+def frame_memory(df):
+    """Deep memory usage of a DataFrame in bytes."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def normalize_frame(df, table_name):
+    """
+    Cast a freshly loaded frame to the compact dtypes declared in TABLE_SCHEMAS.
+
+    Columns missing from the frame are skipped, and tables without a schema are
+    returned unchanged. The before/after memory is logged and kept in MEMORY_REPORT.
+    """
+    schema = TABLE_SCHEMAS.get(table_name)
+    if schema is None or df.empty:
+        return df
+
+    before = frame_memory(df)
+    df = df.copy()
+
+    if schema.get("clean_country") and "country" in df.columns:
+        df["country"] = clean_country(df["country"])
+    for col in schema.get("numeric", []):
+        if col in df.columns:
+            df[col] = _to_numeric(df[col])
+    for col in schema.get("datetime", []):
+        if col in df.columns:
+            df[col] = _to_datetime(df[col])
+    for col in schema.get("string", []):
+        if col in df.columns:
+            df[col] = df[col].astype("string[pyarrow]")
+    for col in schema.get("category", []):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    after = frame_memory(df)
+    MEMORY_REPORT[table_name] = {"rows": len(df), "before": before, "after": after}
+    logger.info("%s: %d rows, %.1f KiB -> %.1f KiB", table_name, len(df), before / 1024, after / 1024)
+    return df
@@ -0,0 +1,286 @@
+import argparse
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from itertools import islice
+
+import requests
+from dotenv import load_dotenv
+
+from spike_detector import SpikeDetector, record_spikes
+from supabase_pool import create_pooled_client
+from trends_batching import fetch_comparable
+from trends_client import TrendsClient, split_keywords
+
+logger = logging.getLogger(__name__)
+
+# Streaming Google Trends -> Supabase ingestion.
+# Every stage is a generator: jobs are fetched a small window at a time, payloads
+# are parsed into validated row dicts lazily, and rows are upserted in fixed-size
+# batches, so memory stays flat however large the keyword x geo x timeframe run is.
+
+UPSERT_BATCH_SIZE = int(os.getenv("TRENDS_UPSERT_BATCH_SIZE", 500))
+FETCH_WINDOW = int(os.getenv("TRENDS_FETCH_WINDOW", 16))  # geo/related requests in flight per window
+
+# dataset -> (table, upsert conflict key). The unique indexes are in migrations/001_trends_ingestion_keys.sql
+INGEST_TARGETS = {
+    "timeline": ("brd_gtrends_multitimeline", ("keyword", "time", "geo")),
+    "geo": ("brd_gtrends_geomap", ("keyword", "geo", "region/state")),
+    "queries": ("brd_gtrends_relatedqueries", ("keyword", "geo", "category", "relatedquery")),
+    "topics": ("brd_gtrends_relatedentities", ("keyword", "geo", "category", "relatedtopic")),
+}
+
+# keywordType sent to the related searches endpoint, the text column it fills and how to read the text
+RELATED_TYPES = {
+    "queries": ("QUERY", "relatedquery", lambda item: item.get("query")),
+    "topics": ("ENTITY", "relatedtopic", lambda item: (item.get("topic") or {}).get("title")),
+}
+RELATED_CATEGORIES = ("TOP", "RISING")  # order of the ranked lists in the response
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _valid_interest(value):
+    return _is_number(value) and 0 <= value <= 100
+
+
+def batched(rows, size):
+    """Yield lists of at most `size` items from any iterable."""
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def timeline_rows(frame, geo=""):
+    """
+    Yield one multitimeline row per (keyword, time) point of a time x keyword frame.
+
+    Points with no data or an interest outside 0-100 are skipped.
+    """
+    if frame.empty:
+        return
+    times = frame.index.strftime("%Y-%m-%dT%H:%M:%SZ")
+    dates = frame.index.strftime("%Y-%m-%d")
+    for keyword in frame.columns:
+        for time, day, value in zip(times, dates, frame[keyword].to_numpy(dtype="float64")):
+            if _valid_interest(value):
+                yield {"keyword": keyword, "time": time, "date": day, "interest": int(round(value)), "geo": geo}
+
+
+def geo_rows(payload, keyword, geo=""):
+    """
+    Yield interest-by-region rows from a comparedgeo payload.
+
+    Sub-regions are stored by their short code ("US-CA" -> "CA") so the map can use
+    USA-states locations; worldwide runs store country names.
+    """
+    for item in payload.get("default", {}).get("geoMapData", []):
+        if not (item.get("hasData") or [False])[0]:
+            continue
+        region = item.get("geoCode", "").split("-")[-1] if geo else item.get("geoName")
+        value = (item.get("value") or [None])[0]
+        if region and _valid_interest(value):
+            yield {"keyword": keyword, "geo": geo, "region/state": region, "interest": value}
+
+
+def related_rows(payload, keyword, geo="", dataset="queries"):
+    """
+    Yield TOP and RISING rows from a relatedsearches payload.
+
+    TOP values are relative interest (0-100); RISING values are the percentage increase
+    in search frequency and go to `searchfreqinc`.
+    """
+    _, text_column, text_of = RELATED_TYPES[dataset]
+    ranked_lists = payload.get("default", {}).get("rankedList", [])
+    for category, ranked in zip(RELATED_CATEGORIES, ranked_lists):
+        for item in ranked.get("rankedKeyword", []):
+            text, value = text_of(item), item.get("value")
+            if not text or not _is_number(value) or value < 0:
+                continue
+            if category == "TOP" and value > 100:
+                continue
+            yield {
+                "keyword": keyword,
+                "geo": geo,
+                "country": geo or "Worldwide",
+                "category": category,
+                text_column: text,
+                "interest": value if category == "TOP" else None,
+                "searchfreqinc": value if category == "RISING" else None,
+            }
+
+
+def iter_jobs(keywords, geos, timeframes):
+    """Yield every (keyword, geo, start_time, end_time) combination of the run matrix."""
+    for start_time, end_time in timeframes:
+        for geo in geos:
+            for keyword in keywords:
+                yield keyword, geo, start_time, end_time
+
+
+def iter_payloads(fetch, jobs, max_workers=FETCH_WINDOW):
+    """
+    Run `fetch(*job)` for every job, at most `max_workers` at a time, yielding (job, payload).
+
+    Only one window of responses is held in memory. Failed jobs are logged and skipped.
+    """
+    def run(job):
+        try:
+            return fetch(*job)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning("Skipping %s: %s", job, e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for window in batched(jobs, max_workers):
+            for job, payload in zip(window, pool.map(run, window)):
+                if payload is not None:
+                    yield job, payload
+
+
+def iter_timeline(client, keywords, geos, timeframes, anchor=None):
+    """Yield multitimeline rows for each (geo, timeframe), all keywords on one comparable scale."""
+    for start_time, end_time in timeframes:
+        for geo in geos:
+            frame, errors = fetch_comparable(client, keywords, start_time, end_time, geo, anchor=anchor)
+            for idx, error in errors.items():
+                logger.warning("Timeline group %d (%s, %s %s) failed: %s", idx, geo or "worldwide", start_time, end_time, error)
+            yield from timeline_rows(frame, geo)
+
+
+def iter_geo(client, keywords, geos, timeframes):
+    """Yield interest-by-region rows for every keyword of the run matrix."""
+    def fetch(keyword, geo, start_time, end_time):
+        return client.fetch_geo(keyword, start_time, end_time, geo)
+
+    for (keyword, geo, _, _), payload in iter_payloads(fetch, iter_jobs(keywords, geos, timeframes)):
+        yield from geo_rows(payload, keyword, geo)
+
+
+def iter_related(client, keywords, geos, timeframes, dataset="queries"):
+    """Yield related query or topic rows for every keyword of the run matrix."""
+    keyword_type = RELATED_TYPES[dataset][0]
+
+    def fetch(keyword, geo, start_time, end_time):
+        return client.fetch_related(keyword, start_time, end_time, geo, keyword_type)
+
+    for (keyword, geo, _, _), payload in iter_payloads(fetch, iter_jobs(keywords, geos, timeframes)):
+        yield from related_rows(payload, keyword, geo, dataset)
+
+
+def upsert_rows(db, table, rows, key_columns, batch_size=UPSERT_BATCH_SIZE, dry_run=False, on_batch=None):
+    """
+    Upsert `rows` into `table` in batches, resolving conflicts on `key_columns`.
+
+    Duplicate keys inside one batch are collapsed (last one wins), since Postgres rejects
+    an upsert that touches the same row twice. `on_batch(batch)` is called after each
+    batch is written. Returns the number of rows written.
+    """
+    on_conflict = ",".join(f'"{col}"' if not col.isidentifier() else col for col in key_columns)
+    written = 0
+    for batch in batched(rows, batch_size):
+        batch = list({tuple(row[col] for col in key_columns): row for row in batch}.values())
+        if not dry_run:
+            db.table(table).upsert(batch, on_conflict=on_conflict).execute()
+        if on_batch is not None:
+            on_batch(batch)
+        written += len(batch)
+    return written
+
+
+def spike_hook(db, detector, dry_run=False):
+    """on_batch callback that feeds timeline rows to the spike detector and records what it flags."""
+    def on_batch(batch):
+        events = detector.update_rows(batch)
+        if events.empty:
+            return
+        logger.info("%d spike(s) flagged, e.g. %s at %s", len(events), events["keyword"].iloc[0], events["time"].iloc[0])
+        if not dry_run:
+            try:
+                record_spikes(db, events)
+            except Exception as e:  # never lose the ingested data over the spikes table
+                logger.warning("Could not record spikes: %s", e)
+    return on_batch
+
+
+def ingest(db, client, keywords, geos, timeframes, datasets=tuple(INGEST_TARGETS), anchor=None,
+           batch_size=UPSERT_BATCH_SIZE, dry_run=False, detector=None):
+    """
+    Fetch the keyword x geo x timeframe matrix and upsert it into the brd_gtrends_* tables.
+
+    Parameters:
+    - db: Supabase client (unused when dry_run is set).
+    - client: A TrendsClient.
+    - keywords: Comma-separated string or list of terms.
+    - geos: Geo codes ("" for worldwide, "US", ...).
+    - timeframes: (start_time, end_time) pairs.
+    - datasets: Any of "timeline", "geo", "queries", "topics".
+    - detector: Optional SpikeDetector fed with every timeline batch (spikes go to brd_gtrends_spikes).
+
+    Returns:
+    - dict of dataset -> rows written.
+    """
+    keywords = list(dict.fromkeys(split_keywords(keywords)))
+    sources = {
+        "timeline": lambda: iter_timeline(client, keywords, geos, timeframes, anchor),
+        "geo": lambda: iter_geo(client, keywords, geos, timeframes),
+        "queries": lambda: iter_related(client, keywords, geos, timeframes, "queries"),
+        "topics": lambda: iter_related(client, keywords, geos, timeframes, "topics"),
+    }
+
+    written = {}
+    for dataset in datasets:
+        table, key_columns = INGEST_TARGETS[dataset]
+        on_batch = spike_hook(db, detector, dry_run) if detector is not None and dataset == "timeline" else None
+        written[dataset] = upsert_rows(db, table, sources[dataset](), key_columns, batch_size, dry_run, on_batch)
+        logger.info("%s: %d rows %s %s", dataset, written[dataset], "parsed for" if dry_run else "upserted into", table)
+    return written
+
+
+def parse_timeframe(value):
+    """"2025-01-01 2025-03-31" -> ("2025-01-01", "2025-03-31")."""
+    parts = value.split()
+    if len(parts) != 2:
+        raise argparse.ArgumentTypeError(f"expected 'START END', got {value!r}")
+    return parts[0], parts[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest Google Trends data into the brd_gtrends_* Supabase tables.")
+    parser.add_argument("--keywords", required=True, help='Comma-separated terms, e.g. "box braids, knotless braids"')
+    parser.add_argument("--geo", action="append", dest="geos", help='Geo code; repeat for several. Omit for worldwide.')
+    parser.add_argument("--timeframe", action="append", dest="timeframes", type=parse_timeframe,
+                        help='"START END" (e.g. "2025-01-01 2025-03-31"); repeat for several. Default: last 90 days.')
+    parser.add_argument("--datasets", nargs="+", choices=list(INGEST_TARGETS), default=list(INGEST_TARGETS))
+    parser.add_argument("--anchor", help="Term shared by every timeline request (default: first keyword)")
+    parser.add_argument("--batch-size", type=int, default=UPSERT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Fetch and validate, but do not write to Supabase")
+    parser.add_argument("--detect-spikes", action="store_true", help="Feed timeline rows to the spike detector")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    load_dotenv()
+
+    today = date.today()
+    timeframes = args.timeframes or [((today - timedelta(days=90)).isoformat(), today.isoformat())]
+    db = None if args.dry_run else create_pooled_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    client = TrendsClient()
+    detector = SpikeDetector.load() if args.detect_spikes else None
+    try:
+        written = ingest(db, client, args.keywords, args.geos or [""], timeframes, args.datasets, args.anchor,
+                         args.batch_size, args.dry_run, detector)
+    finally:
+        client.close()
+    if detector is not None and not args.dry_run:
+        detector.save()
+
+    for dataset, count in written.items():
+        print(f"{dataset:>10}: {count:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# Which keywords move together, and which move first.
+# The multitimeline rows are pivoted onto a regular time x keyword grid, every
+# column is z-normalized, and then:
+# - the correlation matrix is one matrix product (Z.T @ Z / n);
+# - cross-correlations at every lag come from the FFT (correlation theorem), a
+#   block of keywords at a time so memory stays bounded.
+# Cost is O(k^2 * n log n), so the page caches the result per data version.
+
+MAX_KEYWORDS = 200        # most-searched keywords analysed (bounds the k^2 work)
+MAX_LAG = 14              # grid steps checked either way for lead/lag
+MIN_POINTS = 8            # keywords with fewer grid points are skipped
+FFT_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def choose_grid(times):
+    """Grid step for the pivot: hourly for spans up to a week, daily otherwise."""
+    times = pd.to_datetime(times, utc=True, errors="coerce").dropna()
+    if times.empty:
+        return "D"
+    return "h" if times.max() - times.min() <= pd.Timedelta(days=7) else "D"
+
+
+def pivot_matrix(df, keyword_col="keyword", value_col="interest", time_col="time", freq=None,
+                 max_keywords=MAX_KEYWORDS, min_points=MIN_POINTS):
+    """
+    Time x keyword matrix of mean interest on a regular grid.
+
+    Rows are placed by the full timestamp (`time`, not the day-granular `date`), so
+    the hourly grid chosen for short spans really has one point per hour.
+
+    Keeps the `max_keywords` keywords with the highest average interest that have at
+    least `min_points` grid points. Gaps inside a series are interpolated, and the
+    remaining edges are filled with the keyword's mean.
+    """
+    if df.empty:
+        return pd.DataFrame()
+    times = pd.to_datetime(df[time_col], utc=True, errors="coerce", format="ISO8601")
+    freq = freq or choose_grid(times)
+
+    matrix = (
+        df.assign(_t=times.dt.floor(freq))
+        .dropna(subset=["_t", value_col])
+        .pivot_table(index="_t", columns=keyword_col, values=value_col, aggfunc="mean", observed=True)
+    )
+    if matrix.empty:
+        return matrix
+    matrix = matrix.loc[:, matrix.count() >= min_points]
+    matrix = matrix[matrix.mean().nlargest(max_keywords).index]
+    matrix = matrix.reindex(pd.date_range(matrix.index.min(), matrix.index.max(), freq=freq))
+    matrix = matrix.interpolate(limit_area="inside").fillna(matrix.mean())
+    matrix.index.name = "time"
+    matrix.columns = matrix.columns.astype(str)
+    return matrix
+
+
+def _zscore(values):
+    centered = values - values.mean(axis=0)
+    std = centered.std(axis=0)
+    std[std == 0] = np.inf  # flat series correlate with nothing
+    return centered / std
+
+
+def correlation_matrix(matrix):
+    """Pearson correlation of every keyword pair as a k x k DataFrame."""
+    z = _zscore(matrix.to_numpy(dtype="float64"))
+    corr = z.T @ z / len(z)
+    return pd.DataFrame(np.clip(corr, -1, 1), index=matrix.columns, columns=matrix.columns)
+
+
+def cross_correlation_lags(matrix, max_lag=MAX_LAG, block_bytes=FFT_BLOCK_BYTES):
+    """
+    Strongest cross-correlation of every pair within +-`max_lag` grid steps.
+
+    Returns (best_lag, best_corr) k x k arrays. best_lag[i, j] = L > 0 means keyword i
+    leads keyword j by L steps (i at time t lines up with j at t + L).
+    """
+    z = _zscore(matrix.to_numpy(dtype="float64"))
+    n, k = z.shape
+    max_lag = min(max_lag, n - 1)
+    size = 1 << int(np.ceil(np.log2(2 * n)))        # zero-pad so the correlation is linear, not circular
+    spectra = np.fft.rfft(z, n=size, axis=0)         # (size/2 + 1, k)
+    lags = np.r_[0:max_lag + 1, -max_lag:0]          # positions in the irfft output: 0..L, then -L..-1
+    positions = lags % size
+
+    best_lag = np.zeros((k, k), dtype=np.int64)
+    best_corr = np.zeros((k, k))
+    rows_per_block = max(1, block_bytes // (spectra.shape[0] * k * 16))
+    for start in range(0, k, rows_per_block):
+        stop = min(start + rows_per_block, k)
+        # c[i, j, tau] = sum_t z_i(t) * z_j(t + tau)
+        cross = np.fft.irfft(np.conj(spectra[:, start:stop, None]) * spectra[:, None, :], n=size, axis=0)
+        window = cross[positions] / n               # (lags, block, k)
+        pick = np.abs(window).argmax(axis=0)
+        best_lag[start:stop] = lags[pick]
+        best_corr[start:stop] = np.take_along_axis(window, pick[None], axis=0)[0]
+    return best_lag, best_corr
+
+
+def leader_follower_pairs(names, best_lag, best_corr, top=10, min_corr=0.5):
+    """
+    Top keyword pairs where one leads the other, strongest correlation first.
+
+    Returns a DataFrame with leader, follower, lead (grid steps) and correlation.
+    """
+    i, j = np.triu_indices(len(names), k=1)
+    lag, corr = best_lag[i, j], best_corr[i, j]
+    keep = (lag != 0) & (corr >= min_corr)
+    i, j, lag, corr = i[keep], j[keep], lag[keep], corr[keep]
+    order = np.argsort(-corr)[:top]
+    names = np.asarray(names, dtype=object)
+    leader = np.where(lag > 0, names[i], names[j])[order]
+    follower = np.where(lag > 0, names[j], names[i])[order]
+    return pd.DataFrame({"leader": leader, "follower": follower, "lead": np.abs(lag)[order], "correlation": corr[order]})
+
+
+def analyze(df, max_keywords=MAX_KEYWORDS, max_lag=MAX_LAG, top_pairs=10, min_corr=0.5):
+    """
+    Correlation and lead/lag analysis of the multitimeline frame.
+
+    Returns:
+    - dict with "correlation" (k x k DataFrame), "pairs" (see leader_follower_pairs)
+      and "freq" (the grid step, so the page can label the lead unit).
+    """
+    matrix = pivot_matrix(df, max_keywords=max_keywords)
+    if matrix.shape[1] < 2:
+        return {"correlation": pd.DataFrame(), "pairs": pd.DataFrame(), "freq": None}
+    best_lag, best_corr = cross_correlation_lags(matrix, max_lag)
+    return {
+        "correlation": correlation_matrix(matrix),
+        "pairs": leader_follower_pairs(list(matrix.columns), best_lag, best_corr, top_pairs, min_corr),
+        "freq": matrix.index.freqstr,
+    }
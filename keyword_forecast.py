@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from keyword_correlation import pivot_matrix
+
+# Short-horizon forecast for every keyword at once, NumPy only.
+# Daily interest is modelled as a linear trend plus weekly and annual Fourier
+# seasonality. All keywords share the same design matrix, so one lstsq call fits
+# every series (Y is days x keywords), and the prediction intervals reuse a single
+# leverage vector scaled by each keyword's residual spread.
+
+FORECAST_MAX_KEYWORDS = 500
+FIT_DAYS = 2 * 365            # fit on the most recent two years so the trend stays local
+MIN_DAYS = 28                 # fewer days than this is not enough to forecast weeks ahead
+WEEKLY_HARMONICS = 3
+ANNUAL_HARMONICS = 4
+INTERVAL_Z = 1.96             # 95% prediction interval
+MIN_WEEKS, MAX_WEEKS = 4, 12
+
+
+def design_matrix(t, n_days):
+    """
+    Regression columns for day offsets `t`: intercept, trend and Fourier terms.
+
+    Weekly terms need two weeks of history and annual terms a full year, so short
+    histories are not overfitted.
+    """
+    t = np.asarray(t, dtype="float64")
+    columns = [np.ones_like(t), t / max(n_days, 1)]
+    seasons = []
+    if n_days >= 14:
+        seasons.append((7.0, WEEKLY_HARMONICS))
+    if n_days >= 365:
+        seasons.append((365.25, ANNUAL_HARMONICS))
+    for period, harmonics in seasons:
+        for k in range(1, harmonics + 1):
+            angle = 2 * np.pi * k * t / period
+            columns += [np.sin(angle), np.cos(angle)]
+    return np.column_stack(columns)
+
+
+def fit_forecast(matrix, weeks=8, z=INTERVAL_Z):
+    """
+    Fit every column of a daily time x keyword matrix and project `weeks` ahead.
+
+    Returns:
+    - forecast: long DataFrame (date, keyword, yhat, lower, upper), clipped to 0-100.
+    - summary: per-keyword DataFrame with the fitted level, trend per week, residual
+      spread, the forecast mean and the strongest weekday.
+    """
+    weeks = int(np.clip(weeks, MIN_WEEKS, MAX_WEEKS))
+    matrix = matrix.iloc[-FIT_DAYS:]
+    n = len(matrix)
+    if n < MIN_DAYS or matrix.shape[1] == 0:
+        return pd.DataFrame(columns=["date", "keyword", "yhat", "lower", "upper"]), pd.DataFrame()
+
+    y = matrix.to_numpy(dtype="float64")
+    x = design_matrix(np.arange(n), n)
+    beta, _, rank, _ = np.linalg.lstsq(x, y, rcond=None)
+    residuals = y - x @ beta
+    dof = max(n - rank, 1)
+    sigma = np.sqrt((residuals ** 2).sum(axis=0) / dof)
+
+    horizon = weeks * 7
+    future_t = np.arange(n, n + horizon)
+    x_future = design_matrix(future_t, n)
+    yhat = x_future @ beta                                             # (horizon, keywords)
+
+    # Prediction interval: sigma * sqrt(1 + x0 (X'X)^-1 x0'), same leverage for every keyword
+    xtx_inv = np.linalg.pinv(x.T @ x)
+    leverage = np.einsum("ij,jk,ik->i", x_future, xtx_inv, x_future)
+    half_width = z * np.sqrt(1 + leverage)[:, None] * sigma[None, :]
+
+    dates = pd.date_range(matrix.index[-1] + pd.Timedelta(days=1), periods=horizon, freq="D")
+    keywords = matrix.columns.to_numpy()
+    forecast = pd.DataFrame({
+        "date": np.repeat(dates, len(keywords)),
+        "keyword": np.tile(keywords, horizon),
+        "yhat": np.clip(yhat, 0, 100).ravel(),
+        "lower": np.clip(yhat - half_width, 0, 100).ravel(),
+        "upper": np.clip(yhat + half_width, 0, 100).ravel(),
+    })
+
+    # Strongest weekday from the weekly terms over one representative week
+    week_t = np.arange(n, n + 7)
+    weekly = design_matrix(week_t, n)[:, 2:2 + 2 * WEEKLY_HARMONICS] @ beta[2:2 + 2 * WEEKLY_HARMONICS] if n >= 14 else None
+    peak_day = (
+        pd.DatetimeIndex(dates[:7]).day_name().to_numpy()[weekly.argmax(axis=0)] if weekly is not None else None
+    )
+
+    summary = pd.DataFrame({
+        "level": (x[-1] @ beta),
+        "trend_per_week": beta[1] / n * 7,
+        "residual_std": sigma,
+        "forecast_mean": np.clip(yhat, 0, 100).mean(axis=0),
+        "forecast_low": np.clip(yhat - half_width, 0, 100).mean(axis=0),
+        "forecast_high": np.clip(yhat + half_width, 0, 100).mean(axis=0),
+        "peak_weekday": peak_day,
+    }, index=pd.Index(keywords, name="keyword"))
+    return forecast, summary
+
+
+def forecast_keywords(df, weeks=8, max_keywords=FORECAST_MAX_KEYWORDS):
+    """Daily pivot of the multitimeline frame followed by fit_forecast."""
+    matrix = pivot_matrix(df, freq="D", max_keywords=max_keywords)
+    if matrix.empty:
+        return pd.DataFrame(columns=["date", "keyword", "yhat", "lower", "upper"]), pd.DataFrame()
+    return fit_forecast(matrix, weeks)
+
+
+def describe_forecast(summary, keyword, weeks):
+    """One-paragraph forecast summary for a keyword, used as LLM context (None if not forecast)."""
+    if summary.empty or keyword not in summary.index:
+        return None
+    row = summary.loc[keyword]
+    direction = "rising" if row["trend_per_week"] > 0.5 else "falling" if row["trend_per_week"] < -0.5 else "flat"
+    text = (
+        f"Over the next {weeks} weeks, search interest in **{keyword}** is forecast to average "
+        f"{row['forecast_mean']:.0f} (95% range {row['forecast_low']:.0f}–{row['forecast_high']:.0f}), "
+        f"currently around {row['level']:.0f} with a {direction} trend of {row['trend_per_week']:+.1f} points per week."
+    )
+    if row["peak_weekday"]:
+        text += f" Interest is typically highest on {row['peak_weekday']}s."
+    return text
@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+
+# Per-keyword index over the multitimeline frame.
+# The frame is sorted once by (keyword, parsed time) so every keyword's rows form one
+# contiguous, time-ordered slice; peak, mean and top-k rows for every keyword are
+# computed in the same pass with NumPy reductions over those slices. Looking up a
+# keyword afterwards is a dict hit plus an iloc slice.
+
+TOP_K = 10  # rows kept per keyword for the "Highest Interest Times" table
+WEEK = np.timedelta64(7, "D").astype("timedelta64[ns]").astype(np.int64)
+
+
+def frame_version(df, id_column="id", updated_column="updated_at"):
+    """
+    Cheap fingerprint of a loaded table: (row count, highest id, latest update).
+
+    Rows are upserted in place, so the latest updated_at is what moves when an
+    existing row gets a new value.
+    """
+    if df.empty or id_column not in df.columns:
+        return (len(df), None, None)
+    latest = str(df[updated_column].max()) if updated_column in df.columns else None
+    return (len(df), int(df[id_column].max()), latest)
+
+
+class KeywordIndex:
+    """
+    Keyword -> contiguous slice of a time-sorted frame, with precomputed stats.
+
+    Parameters:
+    - df: multitimeline frame with keyword, interest and time columns.
+    - sort_col: Day-granular fallback ordering, used only when `time_col` cannot be parsed.
+    - top_k: How many highest-interest rows to keep per keyword.
+    """
+
+    def __init__(self, df, keyword_col="keyword", value_col="interest", time_col="time", sort_col="date", top_k=TOP_K):
+        self.keyword_col, self.value_col, self.time_col, self.sort_col = keyword_col, value_col, time_col, sort_col
+        self._summary = None
+        if keyword_col not in df.columns:  # nothing loaded yet
+            df = pd.DataFrame(columns=[keyword_col, value_col, time_col])
+        frame = df.dropna(subset=[keyword_col])
+        # Hourly rows share a date, so order on the full parsed timestamp (missing times last)
+        when = self._parse_times(frame)
+        keys = pd.DataFrame({"keyword": frame[keyword_col].to_numpy(), "when": when.to_numpy()})
+        order = keys.sort_values(["keyword", "when"], kind="stable").index.to_numpy()  # positions: labels may repeat
+        frame = frame.iloc[order].reset_index(drop=True)
+        when = when.iloc[order].reset_index(drop=True)
+        self.frame = frame
+        self._when, self._has_when = pd.DatetimeIndex(when).as_unit("ns").asi8, when.notna().to_numpy()
+
+        keywords = frame[keyword_col].astype(str).to_numpy()
+        n = len(frame)
+        if n == 0:
+            self.keywords, self.slices, self.stats_frame, self._top_rows = [], {}, pd.DataFrame(), {}
+            return
+
+        starts = np.flatnonzero(np.r_[True, keywords[1:] != keywords[:-1]])
+        ends = np.r_[starts[1:], n]
+        self.keywords = keywords[starts].tolist()
+        self.slices = {kw: slice(int(s), int(e)) for kw, s, e in zip(self.keywords, starts, ends)}
+
+        values = pd.to_numeric(frame[value_col], errors="coerce").to_numpy(dtype="float64")
+        valid = ~np.isnan(values)
+        group = np.repeat(np.arange(len(starts)), ends - starts)
+
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        self._starts, self._group, self._values, self._valid = starts, group, values, valid
+        self._counts, self._sums = counts, sums
+        peaks = np.maximum.reduceat(np.where(valid, values, -np.inf), starts)
+
+        # Rows ordered by keyword, then interest descending (earliest first on ties)
+        order = np.lexsort((-np.where(valid, values, -np.inf), group))
+        rank = np.arange(n) - starts[group[order]]
+        keep = order[(rank < top_k) & valid[order]]
+        bounds = np.searchsorted(group[keep], np.arange(len(starts) + 1))
+        self._top_rows = {kw: keep[bounds[g]:bounds[g + 1]] for g, kw in enumerate(self.keywords)}
+
+        peak_rows = order[starts]  # first row of each group in `order` is its peak
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        self.stats_frame = pd.DataFrame({
+            "keyword": self.keywords,
+            "points": counts,
+            "peak": np.where(counts > 0, peaks, np.nan),
+            "peak_time": np.where(counts > 0, frame[time_col].to_numpy()[peak_rows], None) if time_col in frame.columns else None,
+            "mean": means,
+        }).set_index("keyword")
+
+    def _parse_times(self, frame):
+        """Row times as UTC timestamps: the time column, else the day-granular sort column."""
+        for col in (self.time_col, self.sort_col):
+            if col in frame.columns:
+                when = pd.to_datetime(frame[col], utc=True, errors="coerce", format="ISO8601")
+                if when.notna().any():
+                    return when
+        return pd.Series(pd.NaT, index=frame.index, dtype="datetime64[ns, UTC]")
+
+    def _timestamps(self):
+        """Row times as int64 nanoseconds and a not-missing mask, in frame order."""
+        return self._when, self._has_when
+
+    def summary(self):
+        """
+        One row per keyword: peak, peak time, average, latest value, week-over-week growth and volatility.
+
+        Computed with NumPy reductions over the keyword slices (no per-keyword loop) and
+        memoized on the index, so it is built once per data version. `latest` is the value
+        at the keyword's most recent timestamp (slices are ordered on the parsed time, so
+        hourly points within a day count); `wow_growth` is the % change between the mean
+        of each keyword's last 7 days and the 7 days before; `volatility` is the standard
+        deviation of interest.
+        """
+        if self._summary is not None:
+            return self._summary
+        if not self.keywords:
+            self._summary = pd.DataFrame(columns=["peak_time", "peak", "mean", "latest", "latest_time",
+                                                  "wow_growth", "volatility", "points"])
+            return self._summary
+
+        starts, group, values, valid = self._starts, self._group, self._values, self._valid
+        counts, sums = self._counts, self._sums
+
+        # Latest valid row of each slice (rows without a time sort last, so prefer timed rows)
+        when, has_time = self._timestamps()
+        timed = valid & has_time
+        last_timed = np.maximum.reduceat(np.where(timed, np.arange(len(values)), -1), starts)
+        last_any = np.maximum.reduceat(np.where(valid, np.arange(len(values)), -1), starts)
+        last_rows = np.where(last_timed >= 0, last_timed, last_any)
+        has_last = last_rows >= 0
+        last_rows = last_rows.clip(0)
+
+        # Sample standard deviation from the sum of squares
+        squares = np.add.reduceat(np.where(valid, values * values, 0.0), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = (squares - sums * sums / counts) / (counts - 1)
+
+        # Week-over-week: rows aged [0, 7) days vs [7, 14) days before each keyword's latest point
+        age = when[last_rows][group] - when
+        usable = valid & has_time
+        this_week = usable & (age >= 0) & (age < WEEK)
+        last_week = usable & (age >= WEEK) & (age < 2 * WEEK)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            this_mean = np.add.reduceat(np.where(this_week, values, 0.0), starts) / np.add.reduceat(this_week.astype(np.int64), starts)
+            last_mean = np.add.reduceat(np.where(last_week, values, 0.0), starts) / np.add.reduceat(last_week.astype(np.int64), starts)
+            growth = np.where(last_mean > 0, (this_mean - last_mean) / last_mean * 100.0, np.nan)
+
+        times = self.frame[self.time_col].to_numpy() if self.time_col in self.frame.columns else np.full(len(values), None)
+        summary = self.stats_frame[["peak_time", "peak", "mean"]].copy()
+        summary["latest"] = np.where(has_last, values[last_rows], np.nan)
+        summary["latest_time"] = np.where(has_last, times[last_rows], None)
+        summary["wow_growth"] = growth
+        summary["volatility"] = np.sqrt(np.clip(variance, 0, None))
+        summary["points"] = counts
+        self._summary = summary
+        return summary
+
+    def __contains__(self, keyword):
+        return keyword in self.slices
+
+    def series(self, keyword):
+        """Time-sorted rows for one keyword (empty frame if unknown)."""
+        return self.frame.iloc[self.slices.get(keyword, slice(0, 0))]
+
+    def stats(self, keyword):
+        """{"points", "peak", "peak_time", "mean"} for one keyword, or None if unknown."""
+        if keyword not in self.slices:
+            return None
+        return self.stats_frame.loc[keyword].to_dict()
+
+    def top(self, keyword, k=TOP_K):
+        """The `k` highest-interest rows of one keyword, highest first (k is capped at top_k)."""
+        rows = self._top_rows.get(keyword, np.array([], dtype=np.int64))
+        return self.frame.iloc[rows[:k]]
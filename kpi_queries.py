@@ -0,0 +1,90 @@
+import re
+
+import pandas as pd
+
+from table_loader import select_clause
+
+# Competitor Analysis data served by Supabase instead of a download of the whole table.
+# The SQL functions ship in migrations/003_outre_product_kpis.sql and are called
+# through PostgREST RPC; the product listing is filtered and paged with a plain
+# table query (`in` / `ilike` filters plus `.range()`), so the page only ever
+# receives the rows it shows.
+
+OUTRE_TABLE = "brd_outre_products"
+OUTRE_DIMENSIONS = ("subcategory", "length")
+LISTING_COLUMNS = ["name", "subcategory", "quantity", "length", "link", "modified"]
+
+
+def _as_filter(values):
+    """PostgREST array parameter: None (no filter) for an empty selection."""
+    return [str(v) for v in values] if values else None
+
+
+def name_pattern(search):
+    """ILIKE pattern matching `search` anywhere in a product name (None for an empty search)."""
+    search = (search or "").strip()
+    if not search:
+        return None
+    return "%" + re.sub(r"([\\%_])", r"\\\1", search) + "%"  # the search text is matched literally
+
+
+def _filter_params(subcategories=None, lengths=None, name_search=None):
+    return {
+        "subcategories": _as_filter(subcategories),
+        "lengths": _as_filter(lengths),
+        "name_pattern": name_pattern(name_search),
+    }
+
+
+def outre_kpis(client, subcategories=None, lengths=None, name_search=None):
+    """
+    Headline numbers for brd_outre_products, after the page's filters (none = whole table).
+
+    Returns:
+    - dict with total_products, most_common_subcategory and latest_modified (a Timestamp or NaT).
+    """
+    rows = client.rpc("outre_product_kpis", _filter_params(subcategories, lengths, name_search)).execute().data
+    row = rows[0] if rows else {}
+    return {
+        "total_products": int(row.get("total_products") or 0),
+        "most_common_subcategory": row.get("most_common_subcategory"),
+        "latest_modified": pd.to_datetime(row.get("latest_modified"), errors="coerce"),
+    }
+
+
+def outre_counts(client, dimension, subcategories=None, lengths=None, name_search=None):
+    """
+    Products per subcategory or length after the page's filters, most common first.
+
+    Returns:
+    - DataFrame with the dimension column and "count" (the first row is the mode).
+    """
+    if dimension not in OUTRE_DIMENSIONS:
+        raise ValueError(f"Unknown dimension: {dimension}")
+    params = {"dimension": dimension, **_filter_params(subcategories, lengths, name_search)}
+    rows = client.rpc("outre_product_counts", params).execute().data
+    return pd.DataFrame(rows, columns=["value", "count"]).rename(columns={"value": dimension})
+
+
+def outre_options(client, dimension):
+    """Sorted distinct values of a dimension, for the filter widgets."""
+    return sorted(outre_counts(client, dimension)[dimension].dropna().astype(str))
+
+
+def outre_listing(client, subcategories=None, lengths=None, name_search=None, start=0, page_size=50, columns=LISTING_COLUMNS):
+    """
+    One page of products matching the page's filters.
+
+    Returns:
+    - (DataFrame of at most `page_size` rows, total number of matching products)
+    """
+    query = client.table(OUTRE_TABLE).select(select_clause(columns), count="exact")
+    if subcategories:
+        query = query.in_("subcategory", _as_filter(subcategories))
+    if lengths:
+        query = query.in_("length", _as_filter(lengths))
+    pattern = name_pattern(name_search)
+    if pattern:
+        query = query.ilike("name", pattern)
+    response = query.order("id").range(start, start + page_size - 1).execute()
+    return pd.DataFrame(response.data, columns=columns), response.count or 0
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Defaults can be overridden from the .env file
+DEFAULT_CACHE_PATH = os.path.join(".cache", "llm_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60  # one week
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so cosmetic indentation changes do not miss the cache."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def prompt_key(model_name, prompt):
+    """Cache key: model name plus a hash of the normalized prompt."""
+    digest = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    return f"{model_name}:{digest}"
+
+
+class LLMCache:
+    """
+    Disk-backed (SQLite) cache for LLM responses that survives restarts and deploys.
+
+    - Every entry carries its own expiry (TTL).
+    - The table is bounded to `max_entries`; the least recently used rows are evicted first.
+    - `hits` / `misses` count lookups made by this process.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # several Streamlit processes may share the file
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_last_access ON llm_responses (last_access)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache configured from LLM_CACHE_PATH / LLM_CACHE_TTL / LLM_CACHE_MAX_ENTRIES."""
+        return cls(
+            path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+            ttl=int(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        )
+
+    def get(self, model_name, prompt):
+        """Return the cached response, or None on a miss or an expired entry."""
+        key = prompt_key(model_name, prompt)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, model_name, prompt, response, ttl=None):
+        """Store a response and evict least recently used entries beyond `max_entries`."""
+        key = prompt_key(model_name, prompt)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, expires_at, now),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM llm_responses WHERE key IN (
+                    SELECT key FROM llm_responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """Drop every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current number of stored entries."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,33 @@
+-- Unique keys used by ingest_trends.py to upsert Google Trends rows.
+-- Each row is identified by the keyword it was fetched for and the geo of the run ('' = worldwide).
+--
+-- Rows scraped before these columns existed keep keyword / geo NULL: nothing tells which
+-- keyword or geo they belong to, and NULLs are distinct in a unique index, so the legacy
+-- rows never collide with each other or with new rows and no data has to be deleted.
+-- The '' default only applies to rows inserted after the column exists.
+
+ALTER TABLE brd_gtrends_multitimeline ADD COLUMN IF NOT EXISTS geo text;
+ALTER TABLE brd_gtrends_multitimeline ALTER COLUMN geo SET DEFAULT '';
+CREATE UNIQUE INDEX IF NOT EXISTS brd_gtrends_multitimeline_keyword_time_geo
+    ON brd_gtrends_multitimeline (keyword, time, geo);
+
+ALTER TABLE brd_gtrends_geomap ADD COLUMN IF NOT EXISTS keyword text;
+ALTER TABLE brd_gtrends_geomap ADD COLUMN IF NOT EXISTS geo text;
+ALTER TABLE brd_gtrends_geomap ALTER COLUMN keyword SET DEFAULT '';
+ALTER TABLE brd_gtrends_geomap ALTER COLUMN geo SET DEFAULT '';
+CREATE UNIQUE INDEX IF NOT EXISTS brd_gtrends_geomap_keyword_geo_region
+    ON brd_gtrends_geomap (keyword, geo, "region/state");
+
+ALTER TABLE brd_gtrends_relatedqueries ADD COLUMN IF NOT EXISTS keyword text;
+ALTER TABLE brd_gtrends_relatedqueries ADD COLUMN IF NOT EXISTS geo text;
+ALTER TABLE brd_gtrends_relatedqueries ALTER COLUMN keyword SET DEFAULT '';
+ALTER TABLE brd_gtrends_relatedqueries ALTER COLUMN geo SET DEFAULT '';
+CREATE UNIQUE INDEX IF NOT EXISTS brd_gtrends_relatedqueries_keyword_geo_query
+    ON brd_gtrends_relatedqueries (keyword, geo, category, relatedquery);
+
+ALTER TABLE brd_gtrends_relatedentities ADD COLUMN IF NOT EXISTS keyword text;
+ALTER TABLE brd_gtrends_relatedentities ADD COLUMN IF NOT EXISTS geo text;
+ALTER TABLE brd_gtrends_relatedentities ALTER COLUMN keyword SET DEFAULT '';
+ALTER TABLE brd_gtrends_relatedentities ALTER COLUMN geo SET DEFAULT '';
+CREATE UNIQUE INDEX IF NOT EXISTS brd_gtrends_relatedentities_keyword_geo_topic
+    ON brd_gtrends_relatedentities (keyword, geo, category, relatedtopic);
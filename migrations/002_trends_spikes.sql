@@ -0,0 +1,17 @@
+-- Spikes flagged by spike_detector.py (EWMA z-score over brd_gtrends_multitimeline).
+
+CREATE TABLE IF NOT EXISTS brd_gtrends_spikes (
+    id bigserial PRIMARY KEY,
+    keyword text NOT NULL,
+    geo text NOT NULL DEFAULT '',
+    time timestamptz NOT NULL,
+    interest double precision NOT NULL,
+    baseline double precision NOT NULL,
+    zscore double precision NOT NULL,
+    detected_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS brd_gtrends_spikes_keyword_geo_time
+    ON brd_gtrends_spikes (keyword, geo, time);
+CREATE INDEX IF NOT EXISTS brd_gtrends_spikes_detected_at
+    ON brd_gtrends_spikes (detected_at DESC);
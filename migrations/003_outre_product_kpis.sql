@@ -0,0 +1,65 @@
+-- Server-side data for the Competitor Analysis page (see kpi_queries.py).
+-- The page calls these through PostgREST RPC and receives one row per card or chart bar,
+-- and pages its product listings with filtered table queries, so its cost no longer
+-- grows with brd_outre_products.
+
+CREATE INDEX IF NOT EXISTS brd_outre_products_subcategory ON brd_outre_products (subcategory);
+CREATE INDEX IF NOT EXISTS brd_outre_products_length ON brd_outre_products (length);
+CREATE INDEX IF NOT EXISTS brd_outre_products_modified ON brd_outre_products (modified DESC NULLS LAST);
+
+-- Substring name search (`ilike`) for the listing query and the functions below
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS brd_outre_products_name_trgm ON brd_outre_products USING gin (name gin_trgm_ops);
+
+-- Total products, most common subcategory and latest modified value after the filters (NULL = no filter).
+CREATE OR REPLACE FUNCTION outre_product_kpis(
+    subcategories text[] DEFAULT NULL,
+    lengths text[] DEFAULT NULL,
+    name_pattern text DEFAULT NULL
+)
+RETURNS TABLE (total_products bigint, most_common_subcategory text, latest_modified text)
+LANGUAGE sql STABLE
+AS $$
+    WITH filtered AS (
+        SELECT p.subcategory::text AS subcategory, p.modified
+        FROM brd_outre_products p
+        WHERE (subcategories IS NULL OR p.subcategory::text = ANY (subcategories))
+          AND (lengths IS NULL OR p.length::text = ANY (lengths))
+          AND (name_pattern IS NULL OR p.name::text ILIKE name_pattern)
+    )
+    SELECT
+        (SELECT count(*) FROM filtered),
+        (SELECT subcategory FROM filtered
+            WHERE subcategory IS NOT NULL
+            GROUP BY subcategory
+            ORDER BY count(*) DESC, subcategory
+            LIMIT 1),
+        (SELECT max(modified)::text FROM filtered);
+$$;
+
+-- Product counts per subcategory or length, after the filters (NULL = no filter).
+-- Ordered by count, so the first row is the mode; without filters the values are the filter options.
+CREATE OR REPLACE FUNCTION outre_product_counts(
+    dimension text,
+    subcategories text[] DEFAULT NULL,
+    lengths text[] DEFAULT NULL,
+    name_pattern text DEFAULT NULL
+)
+RETURNS TABLE (value text, count bigint)
+LANGUAGE sql STABLE
+AS $$
+    SELECT v.value, count(*)
+    FROM brd_outre_products p
+    CROSS JOIN LATERAL (
+        SELECT CASE dimension WHEN 'subcategory' THEN p.subcategory::text WHEN 'length' THEN p.length::text END AS value
+    ) v
+    WHERE v.value IS NOT NULL
+      AND (subcategories IS NULL OR p.subcategory::text = ANY (subcategories))
+      AND (lengths IS NULL OR p.length::text = ANY (lengths))
+      AND (name_pattern IS NULL OR p.name::text ILIKE name_pattern)
+    GROUP BY v.value
+    ORDER BY 2 DESC, 1;
+$$;
+
+GRANT EXECUTE ON FUNCTION outre_product_kpis(text[], text[], text) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION outre_product_counts(text, text[], text[], text) TO anon, authenticated;
@@ -0,0 +1,50 @@
+-- Change tracking for the Google Trends tables mirrored by trends_mirror.py.
+-- ingest_trends.py upserts rows in place, so a refreshed value keeps its id; updated_at
+-- moves on every insert and every real update, and the mirror and the Insights version
+-- check watermark on (updated_at, id) instead of id.
+
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$;
+
+ALTER TABLE brd_gtrends_multitimeline ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS brd_gtrends_multitimeline_updated_at
+    ON brd_gtrends_multitimeline (updated_at, id);
+DROP TRIGGER IF EXISTS brd_gtrends_multitimeline_set_updated_at ON brd_gtrends_multitimeline;
+CREATE TRIGGER brd_gtrends_multitimeline_set_updated_at
+    BEFORE UPDATE ON brd_gtrends_multitimeline
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+    EXECUTE FUNCTION set_updated_at();
+
+ALTER TABLE brd_gtrends_geomap ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS brd_gtrends_geomap_updated_at
+    ON brd_gtrends_geomap (updated_at, id);
+DROP TRIGGER IF EXISTS brd_gtrends_geomap_set_updated_at ON brd_gtrends_geomap;
+CREATE TRIGGER brd_gtrends_geomap_set_updated_at
+    BEFORE UPDATE ON brd_gtrends_geomap
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+    EXECUTE FUNCTION set_updated_at();
+
+ALTER TABLE brd_gtrends_relatedqueries ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS brd_gtrends_relatedqueries_updated_at
+    ON brd_gtrends_relatedqueries (updated_at, id);
+DROP TRIGGER IF EXISTS brd_gtrends_relatedqueries_set_updated_at ON brd_gtrends_relatedqueries;
+CREATE TRIGGER brd_gtrends_relatedqueries_set_updated_at
+    BEFORE UPDATE ON brd_gtrends_relatedqueries
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+    EXECUTE FUNCTION set_updated_at();
+
+ALTER TABLE brd_gtrends_relatedentities ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS brd_gtrends_relatedentities_updated_at
+    ON brd_gtrends_relatedentities (updated_at, id);
+DROP TRIGGER IF EXISTS brd_gtrends_relatedentities_set_updated_at ON brd_gtrends_relatedentities;
+CREATE TRIGGER brd_gtrends_relatedentities_set_updated_at
+    BEFORE UPDATE ON brd_gtrends_relatedentities
+    FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+    EXECUTE FUNCTION set_updated_at();
@@ -1,44 +1,95 @@
 import streamlit as st
 # **🌟 Page Configuration**
 st.set_page_config(page_title="Google Trends Insights", page_icon="📊", layout="wide")
+import time
 import pandas as pd
 import plotly.express as px
-from supabase import create_client
-import os
-from dotenv import load_dotenv
-import re
-from utils import get_gemini_insight
-
-# ✅ Load environment variables from .env
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-# ✅ Initialize Supabase client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# **🔄 Load Data from Supabase**
-@st.cache_data
-def fetch_data(table_name):
-    """Fetch data from Supabase and clean the country column"""
+import plotly.graph_objects as go
+from utils import get_gemini_insights, get_table_version, load_versioned, run_concurrently, shared_cache, supabase
+from trends_mirror import TRENDS_COLUMNS, sync_table, read_table
+from table_format import create_df_with_bar, add_trend_bar
+from frame_schema import normalize_frame
+from downsample import WEBGL_THRESHOLD, downsample_frame
+from keyword_index import KeywordIndex, frame_version
+from keyword_correlation import analyze as analyze_correlations
+from spike_detector import SPIKE_TABLE
+from keyword_forecast import MAX_WEEKS, MIN_WEEKS, describe_forecast, forecast_keywords
+from shared_cache import make_key
+from trends_filters import MAP_LOCATION_MODES, REGION_GEOS, TIMEFRAMES, combine_geos, for_keyword, mirror_filters, refine_time_window
+
+# **🔄 Load Data from the local mirror of Supabase, filtered by region + timeframe**
+@st.cache_data(max_entries=64)
+def fetch_data(table_name, region="Worldwide", timeframe=None, version=None):
+    """
+    Sync new rows into the local trends mirror, then read only the rows matching the
+    region/timeframe filters (the predicates are pushed down to the Parquet reader) and
+    normalize dtypes (incl. the country column). Cached per (table, region, timeframe)
+    and table version, so new rows in Supabase trigger a sync + reload on the next run.
+    The filtered frame is also shared with the other replicas through shared_cache.
+
+    A failed read raises instead of returning an empty frame, so the failure is never
+    cached under the version; the loader below reports it and uses the table's schema.
+    """
+    def load_filtered():
+        try:
+            sync_table(supabase, table_name)  # only pulls rows inserted or updated since the stored watermark
+        except Exception as e:
+            st.warning(f"Could not sync {table_name}, showing the last mirrored data: {e}")
+
+        df = read_table(table_name, filters=mirror_filters(table_name, region, timeframe))
+        # **Compact dtypes + fix country format for relatedqueries & relatedentities**
+        df = normalize_frame(df.reset_index(drop=True), table_name)
+        # **One row per keyword/time for regions spanning several countries**
+        return combine_geos(df, table_name, region)
+
+    # The pushed-down date predicate is per day, so the shared entry is keyed by day too
+    today = pd.Timestamp.now(tz="UTC").strftime("%Y-%m-%d")
+    df = shared_cache.get_or_compute(make_key("trends", table_name, region, timeframe, version, today), load_filtered)
+    return refine_time_window(df, table_name, timeframe).reset_index(drop=True)  # exact cutoff
+
+TRENDS_TABLES = [
+    "brd_gtrends_geomap",
+    "brd_gtrends_multitimeline",
+    "brd_gtrends_relatedqueries",
+    "brd_gtrends_relatedentities",
+]
+
+# **🚨 Spikes flagged by the streaming detector (see spike_detector.py)**
+@st.cache_data(ttl=300)
+def fetch_recent_spikes(limit=20):
+    """Most recent spike events, newest first"""
     try:
-        response = supabase.table(table_name).select("*").execute()
-        df = pd.DataFrame(response.data)
+        rows = (
+            supabase.table(SPIKE_TABLE)
+            .select("keyword,geo,time,interest,baseline,zscore")
+            .order("time", desc=True)
+            .limit(limit)
+            .execute()
+            .data
+        )
+    except Exception:
+        return pd.DataFrame()
+    return pd.DataFrame(rows)
 
-        # **Fix country format for relatedqueries & relatedentities**
-        if "country" in df.columns:
-            df["country"] = df["country"].astype(str).apply(lambda x: re.sub(r'^.*?,\s*', '', x) if "," in x else x)
+# **⚡ Per-keyword index: built once per data version + filter, so switching keywords is a lookup**
+@st.cache_resource(max_entries=8)
+def get_keyword_index(version, _df):
+    """Keyword -> time-sorted slice with precomputed peak, mean and top rows"""
+    return KeywordIndex(_df)
 
-        return df
-    except Exception as e:
-        st.error(f"Error fetching {table_name}: {e}")
-        return pd.DataFrame()
+# **🔗 Correlation + lead/lag analysis: O(k²·n), so cached per data version too**
+@st.cache_data(max_entries=8, show_spinner="Analyzing how keywords move together...")
+def get_keyword_correlations(version, _df):
+    """Correlation matrix and top leader/follower pairs for the multitimeline frame"""
+    return analyze_correlations(_df)
 
-# **📊 Load Google Trends Data**
-geo_map_df = fetch_data("brd_gtrends_geomap")
-multi_timeline_df = fetch_data("brd_gtrends_multitimeline")
-related_queries_df = fetch_data("brd_gtrends_relatedqueries")
-related_entities_df = fetch_data("brd_gtrends_relatedentities")
+HEATMAP_KEYWORDS = 30  # most-searched keywords shown in the heatmap
+
+# **🔮 Trend + seasonality forecast for every keyword, one batched fit per data version and horizon**
+@st.cache_data(max_entries=8, show_spinner="Forecasting search interest...")
+def get_keyword_forecast(version, weeks, _df):
+    """(forecast rows, per-keyword summary) for the next `weeks` weeks"""
+    return forecast_keywords(_df, weeks)
 
 # ✅ Function to save insights to Supabase
 def save_to_designer(insight_text):
@@ -82,13 +133,13 @@ st.write("---")
 ### **🔍 Filters for Analysis**
 st.markdown("### 🎯 Customize Insights")
 
-col_f1, col_f2, col_f3 = st.columns(3)
+col_f1, col_f2, col_f3, col_f4 = st.columns(4)
 
 # **🌍 Select Region**
 with col_f1:
     region_option = st.selectbox(
         "🌍 Select a Region",
-        options=["Worldwide", "US", "Africa", "Middle East", "Southern Africa"],
+        options=list(REGION_GEOS),
         index=0
     )
 
@@ -96,29 +147,138 @@ with col_f1:
 with col_f2:
     timeframe_option = st.selectbox(
         "⏳ Select a Timeframe",
-        options=[
-            "Past hour", "Past 4 hours", "Past day",
-            "Past 7 days", "Past 30 days", "Past 90 days",
-            "Past 12 months", "Past 5 years"
-        ],
-        index=2
+        options=list(TIMEFRAMES),
+        index=5  # Past 90 days, the window the refresh scheduler keeps current
+    )
+
+# **📊 Load Google Trends Data for the selected filters**
+# All four tables are fetched at once on a thread pool (same fetch_data cache entries),
+# so a cold load costs about one sync round trip instead of four in a row.
+load_timings = {}
+
+def timed_fetch(table):
+    """fetch_data for the current filters, recording how long it took"""
+    start = time.perf_counter()
+    try:
+        return load_versioned(fetch_data, get_table_version(table, "updated_at"), table, region_option, timeframe_option)
+    finally:
+        load_timings[table] = time.perf_counter() - start
+
+load_start = time.perf_counter()
+loaded, load_errors = run_concurrently({table: (lambda table=table: timed_fetch(table)) for table in TRENDS_TABLES})
+load_total = time.perf_counter() - load_start
+
+# A table that failed to load becomes an empty frame with its columns, so the page still renders
+for table, error in load_errors.items():
+    st.error(f"Error fetching {table}: {error}")
+geo_map_df, multi_timeline_df, related_queries_df, related_entities_df = (
+    loaded.get(table, pd.DataFrame(columns=TRENDS_COLUMNS[table])) for table in TRENDS_TABLES
+)
+
+# **⏱️ Per-table load timings (cached tables return in a few ms)**
+with st.expander(f"⏱️ Data loaded in {load_total:.2f}s"):
+    st.dataframe(
+        pd.DataFrame({
+            "Table": TRENDS_TABLES,
+            "Seconds": [round(load_timings.get(table, float("nan")), 3) for table in TRENDS_TABLES],
+            "Rows": [len(loaded[table]) if table in loaded else 0 for table in TRENDS_TABLES],
+        }),
+        hide_index=True,
+        use_container_width=True
     )
+    st.caption(f"Sequential loading would have taken about {sum(load_timings.values()):.2f}s.")
+
+# Filters are part of the version so two filtered views never share a cache entry
+data_version = (region_option, timeframe_option, *frame_version(multi_timeline_df))
+keyword_index = get_keyword_index(data_version, multi_timeline_df)
 
 # **🔍 Select Keyword**
 with col_f3:
     selected_keyword = st.selectbox(
         "📌 Select a Keyword",
-        multi_timeline_df["keyword"].unique() if not multi_timeline_df.empty else ["No Data"]
+        keyword_index.keywords or ["No Data"]
+    )
+keyword_stats = keyword_index.stats(selected_keyword)
+
+# Region and related-search rows of the selected keyword only (one set per ingested keyword)
+geo_map_df, related_queries_df, related_entities_df = (
+    for_keyword(df, selected_keyword) for df in (geo_map_df, related_queries_df, related_entities_df)
+)
+
+# **🔮 Forecast Horizon**
+with col_f4:
+    forecast_weeks = st.select_slider(
+        "🔮 Forecast Horizon (weeks)",
+        options=list(range(MIN_WEEKS, MAX_WEEKS + 1)),
+        value=8
     )
+forecast_df, forecast_summary = get_keyword_forecast(data_version, forecast_weeks, multi_timeline_df)
 
 st.write("---")
 
+# **🤖 AI Insights: collect every narrative the page shows and request them in one Gemini call**
+insight_requests = []
+
+if keyword_stats is not None:
+    top_peak_times_df = keyword_index.top(selected_keyword, 3)[["time", "interest"]]
+    top_peak_times = ", ".join(top_peak_times_df["time"].astype(str).tolist())
+    insight_requests.append((
+        "Top 3 Peak Search Times",
+        f"The highest search activity for **{selected_keyword}** occurred at **{top_peak_times}**."
+    ))
+
+if not geo_map_df.empty:
+    top_region = geo_map_df.nlargest(1, "interest").iloc[0]["region/state"]
+    insight_requests.append((
+        "Top Interest by Region/State",
+        f"The region with the highest search interest is **{top_region}**."
+    ))
+
+top_queries_df = related_queries_df[related_queries_df["category"] == "TOP"]
+if not top_queries_df.empty:
+    top_query = top_queries_df.nlargest(1, "interest")["relatedquery"].values[0]
+    insight_requests.append((
+        "Top Searched Queries",
+        f"The most searched query is **{top_query}**, reflecting high interest in this topic."
+    ))
+
+rising_queries_df = related_queries_df[related_queries_df["category"] == "RISING"]
+if not rising_queries_df.empty:
+    fastest_rising_query = rising_queries_df.nlargest(1, "searchfreqinc")["relatedquery"].values[0]
+    insight_requests.append((
+        "Fastest Growing Queries",
+        f"The fastest-growing search term is **{fastest_rising_query}**, showing a recent surge in interest."
+    ))
+
+top_topics_df = related_entities_df[related_entities_df["category"] == "TOP"]
+if not top_topics_df.empty:
+    top_related_topic = top_topics_df.nlargest(1, "interest")["relatedtopic"].values[0]
+    insight_requests.append((
+        "Top Related Topics",
+        f"The most associated topic is **{top_related_topic}**, indicating strong relevance to the main search trends."
+    ))
+
+rising_topics_df = related_entities_df[related_entities_df["category"] == "RISING"]
+if not rising_topics_df.empty:
+    fastest_growing_topic = rising_topics_df.nlargest(1, "searchfreqinc")["relatedtopic"].values[0]
+    insight_requests.append((
+        "Fastest Growing Topics",
+        f"The fastest-growing topic is **{fastest_growing_topic}**, showing a sharp increase in search volume."
+    ))
+
+forecast_text = describe_forecast(forecast_summary, selected_keyword, forecast_weeks)
+if forecast_text:
+    insight_requests.append(("Search Interest Forecast", forecast_text))
+
+insights = get_gemini_insights(insight_requests)
+
 # Create tabs
-tab1, tab2, tab3, tab4 = st.tabs([
+tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "🔥 Key Insights & Search Trends",
     "🌍 Interest by Region",
     "🔍 Search Insights Breakdown",
-    "🎨 Designer Insights"
+    "🎨 Designer Insights",
+    "📋 All Keywords"
 ])
 
 # Tab 1: Key Insights & Search Trends
@@ -127,9 +287,9 @@ with tab1:
     st.markdown("### 🔥 Key Insights")
     col_m1, col_m2, col_m3, col_m4 = st.columns(4)
 
-    # **📍 Peak Search Time**
-    if not multi_timeline_df.empty:
-        peak_time = multi_timeline_df.loc[multi_timeline_df["interest"].idxmax(), "time"]
+    # **📍 Peak Search Time (selected keyword)**
+    if keyword_stats is not None:
+        peak_time = keyword_stats["peak_time"]
         col_m1.markdown(f"""
             <div style="text-align: center; background-color: #f8f9fa; padding: 10px; border-radius: 8px; border: 1px solid #ddd;">
                 <h5 style="margin-bottom: 5px;">📍 Peak Search Time</h5>
@@ -137,9 +297,9 @@ with tab1:
             </div>
         """, unsafe_allow_html=True)
 
-    # **📊 Average Interest**
-    if not multi_timeline_df.empty:
-        avg_interest = int(multi_timeline_df["interest"].mean())
+    # **📊 Average Interest (selected keyword)**
+    if keyword_stats is not None and keyword_stats["points"]:
+        avg_interest = int(keyword_stats["mean"])
         col_m2.markdown(f"""
             <div style="text-align: center; background-color: #f8f9fa; padding: 10px; border-radius: 8px; border: 1px solid #ddd;">
                 <h5 style="margin-bottom: 5px;">📊 Average Interest</h5>
@@ -149,7 +309,8 @@ with tab1:
 
     # **🚀 Top Rising Related Search Term**
     if not related_queries_df.empty:
-        top_rising_query = related_queries_df.loc[related_queries_df["searchfreqinc"].idxmax(), "relatedquery"]
+        rising_scores = related_queries_df["searchfreqinc"].dropna()  # TOP rows have no searchfreqinc
+        top_rising_query = related_queries_df.loc[rising_scores.idxmax(), "relatedquery"] if not rising_scores.empty else "N/A"
         col_m3.markdown(f"""
             <div style="text-align: center; background-color: #f8f9fa; padding: 10px; border-radius: 8px; border: 1px solid #ddd;">
                 <h5 style="margin-bottom: 5px;">🚀 Top Rising Related Search</h5>
@@ -159,7 +320,8 @@ with tab1:
 
     # **🔥 Top Rising Related Query**
     if not related_entities_df.empty:
-        top_rising_entity = related_entities_df.loc[related_entities_df["searchfreqinc"].idxmax(), "relatedtopic"]
+        rising_scores = related_entities_df["searchfreqinc"].dropna()
+        top_rising_entity = related_entities_df.loc[rising_scores.idxmax(), "relatedtopic"] if not rising_scores.empty else "N/A"
         col_m4.markdown(f"""
             <div style="text-align: center; background-color: #f8f9fa; padding: 10px; border-radius: 8px; border: 1px solid #ddd;">
                 <h5 style="margin-bottom: 5px;">🔥 Top Rising Related Query</h5>
@@ -176,60 +338,64 @@ with tab1:
         col_chart, col_table = st.columns([2, 1])
 
         with col_chart:
-            filtered_df = multi_timeline_df[multi_timeline_df["keyword"] == selected_keyword]
+            filtered_df = keyword_index.series(selected_keyword)
+
+            # **Plot ~one point per pixel (LTTB keeps the peaks); switch to WebGL for long raw series**
+            # (decided on the raw length: the downsampled frame is always capped below the threshold)
+            # (x is the parsed hourly timestamp: on the day-level date, 24 points share one x)
+            chart_df = filtered_df.assign(time=pd.to_datetime(filtered_df["time"], utc=True, errors="coerce", format="ISO8601"))
+            plot_df = downsample_frame(chart_df, "time", "interest", group_col="keyword")
+            use_webgl = len(filtered_df) > WEBGL_THRESHOLD
             fig = px.line(
-                filtered_df,
-                x="date",
+                plot_df,
+                x="time",
                 y="interest",
                 color="keyword",
                 title=f"Search Interest for {selected_keyword} Over Time",
-                line_shape="spline",
-                labels={"interest": "Search Interest", "date": "Date"},
+                line_shape="linear" if use_webgl else "spline",  # Scattergl has no spline
+                render_mode="webgl" if use_webgl else "svg",
+                labels={"interest": "Search Interest", "time": "Time"},
             )
-            st.plotly_chart(fig, use_container_width=True)
-
-    with col_table:
-        st.markdown("### ⏳ Highest Interest Times")
-
-        # Select top 10 highest interest times
-        highest_interest_df = filtered_df.nlargest(10, "interest")[["time", "interest"]]
 
-        # Normalize interest values for visual representation
-        max_interest = highest_interest_df["interest"].max()
-        scale_length = 20  # Adjust scale for trend bars
+            # **Overlay the forecast and its 95% interval**
+            keyword_forecast = forecast_df[forecast_df["keyword"] == selected_keyword]
+            if not keyword_forecast.empty:
+                fig.add_trace(go.Scatter(
+                    x=keyword_forecast["date"], y=keyword_forecast["upper"],
+                    mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip",
+                ))
+                fig.add_trace(go.Scatter(
+                    x=keyword_forecast["date"], y=keyword_forecast["lower"],
+                    mode="lines", line=dict(width=0), fill="tonexty", fillcolor="rgba(79, 70, 229, 0.15)",
+                    name="95% interval", hoverinfo="skip",
+                ))
+                fig.add_trace(go.Scatter(
+                    x=keyword_forecast["date"], y=keyword_forecast["yhat"],
+                    mode="lines", line=dict(color="#4F46E5", dash="dash"), name="Forecast",
+                ))
+            st.plotly_chart(fig, use_container_width=True)
 
-        def get_trend_bar(value):
-            """Create a compact trend bar for visualization"""
-            clamped = min(value, max_interest)
-            bar_len = int(round((clamped / max_interest) * scale_length))
-            return "█" * bar_len
+        with col_table:
+            st.markdown("### ⏳ Highest Interest Times")
 
-        # Apply bar visualization
-        highest_interest_df["Trend"] = highest_interest_df["interest"].apply(get_trend_bar)
+            # Select top 10 highest interest times
+            highest_interest_df = keyword_index.top(selected_keyword, 10)[["time", "interest"]]
 
-        # Combine trend bar and value in one column
-        highest_interest_df["Search Interest"] = highest_interest_df.apply(
-            lambda row: f"{row['Trend']} {row['interest']}", axis=1
-        )
+            # Combine trend bar (scaled to the top value) and value in one column
+            highest_interest_df = add_trend_bar(highest_interest_df, "interest")
 
-        # Keep only necessary columns and rename
-        highest_interest_df = highest_interest_df[["time", "Search Interest"]].rename(columns={"time": "Time"})
+            # Keep only necessary columns and rename
+            highest_interest_df = highest_interest_df[["time", "Search Interest"]].rename(columns={"time": "Time"})
 
-        # Display updated table
-        st.dataframe(highest_interest_df, use_container_width=True, height=388, hide_index=True)
+            # Display updated table
+            st.dataframe(highest_interest_df, use_container_width=True, height=388, hide_index=True)
 
     st.write("---")
     
     # **📍 Top 3 Peak Search Times**
-    if not multi_timeline_df.empty:
-        top_peak_times_df = multi_timeline_df.nlargest(3, "interest")[["time", "interest"]]
-        top_peak_times = ", ".join(top_peak_times_df["time"].astype(str).tolist())
-
+    if keyword_stats is not None:
         # ✅ AI-Generated Insight for Peak Times
-        insight_peak_times = get_gemini_insight(
-            "Top 3 Peak Search Times",
-            f"The highest search activity occurred at **{top_peak_times}**."
-        )
+        insight_peak_times = insights["Top 3 Peak Search Times"]
 
         # Layout to spread across the page (button next to insight)
         col_peak1, col_peak2 = st.columns([5, 1])
@@ -244,6 +410,32 @@ with tab1:
 
     st.write("---")
 
+    # **🔮 Forecast Insight**
+    if forecast_text:
+        display_ai_insight(insights["Search Interest Forecast"], "Forecast")
+
+    # **🚨 Recent Spikes**
+    st.markdown("### 🚨 Recent Spikes")
+    recent_spikes_df = fetch_recent_spikes()
+    if recent_spikes_df.empty:
+        st.info("No spikes flagged yet.")
+    else:
+        st.dataframe(
+            recent_spikes_df,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "keyword": st.column_config.TextColumn("Keyword"),
+                "geo": st.column_config.TextColumn("Region"),
+                "time": st.column_config.TextColumn("Time"),
+                "interest": st.column_config.NumberColumn("Interest", format="%d"),
+                "baseline": st.column_config.NumberColumn("Usual Level", format="%.1f"),
+                "zscore": st.column_config.NumberColumn("Z-Score", format="%.1f", help="Standard deviations above the usual level"),
+            },
+        )
+
+    st.write("---")
+
 # Tab 2: Interest by Region
 with tab2:
     ### **🌍 Heatmap: Search Interest by Country**
@@ -253,15 +445,19 @@ with tab2:
         col_map, col_table = st.columns([2, 1])
 
         with col_map:
-            fig = px.choropleth(
-                geo_map_df,
-                locations="region/state",
-                locationmode='USA-states',       #"country names",
-                color="interest",
-                title="Search Interest by Region",
-                color_continuous_scale="Blues",
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            location_mode = MAP_LOCATION_MODES.get(region_option)
+            if location_mode:
+                fig = px.choropleth(
+                    geo_map_df,
+                    locations="region/state",
+                    locationmode=location_mode,  # country names for Worldwide, state codes for the US
+                    color="interest",
+                    title="Search Interest by Region",
+                    color_continuous_scale="Blues",
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info(f"No map outlines for sub-regions of {region_option}; see the table.")
 
         with col_table:
             st.markdown("### 📌 Top Interest by Region")
@@ -269,23 +465,8 @@ with tab2:
             # Select top 10 countries with highest interest
             top_countries_df = geo_map_df.nlargest(10, "interest")[["region/state", "interest"]]
 
-            # Normalize interest values for visualization
-            max_interest = top_countries_df["interest"].max()
-            scale_length = 20  # Adjust scale for trend bars
-
-            def get_trend_bar(value):
-                """Create a compact trend bar for visualization"""
-                clamped = min(value, max_interest)
-                bar_len = int(round((clamped / max_interest) * scale_length))
-                return "█" * bar_len
-
-            # Apply trend visualization
-            top_countries_df["Trend"] = top_countries_df["interest"].apply(get_trend_bar)
-
-            # Combine trend bar and value into one column
-            top_countries_df["Search Interest"] = top_countries_df.apply(
-                lambda row: f"{row['Trend']} {row['interest']}", axis=1
-            )
+            # Combine trend bar (scaled to the top value) and value into one column
+            top_countries_df = add_trend_bar(top_countries_df, "interest")
 
             # Keep only necessary columns and rename
             top_countries_df = top_countries_df[["region/state", "Search Interest"]].rename(columns={"region/state": "Region/State"})
@@ -294,55 +475,12 @@ with tab2:
             st.dataframe(top_countries_df, use_container_width=True, height=388, hide_index=True)
     # **🏆 Top Interest by Region/State**
     if not geo_map_df.empty:
-        top_countries_df = geo_map_df.nlargest(10, "interest")[["region/state", "interest"]]
-
-    # **🏆 Top Interest by Region/State**
-    if not top_countries_df.empty:
-        top_region = top_countries_df.iloc[0]["region/state"]
-        insight_region = get_gemini_insight(
-            "Top Interest by Region/State",
-            f"The region with the highest search interest is **{top_region}**."
-        )
-
-        display_ai_insight(insight_region, "Top_Region")
+        display_ai_insight(insights["Top Interest by Region/State"], "Top_Region")
 
     st.write("---")
 
 # Tab 3: Search Insights Breakdown
 with tab3:
-    # ✅ Function to Create Dataframe with Search Interest Bar + Sorting
-    def create_df_with_bar(df, query_col, value_col):
-        if df is None or df.empty:
-            return pd.DataFrame()
-
-        # Keep only necessary columns
-        new_df = df[[query_col, value_col]].copy()
-
-        # Convert to numeric and fill missing values
-        new_df[value_col] = pd.to_numeric(new_df[value_col], errors='coerce').fillna(0)
-
-        # **Sort in Descending Order**
-        new_df = new_df.sort_values(by=value_col, ascending=False)
-
-        # Create visual bar column
-        max_for_bar = 100
-        scale_length = 20  # Controls bar length
-
-        def get_bar(v):
-            clamped = min(v, max_for_bar)
-            bar_len = int(round((clamped / max_for_bar) * scale_length))
-            return '█' * bar_len
-
-        new_df["Search Interest"] = new_df.apply(lambda row: f"{row[value_col]} {get_bar(row[value_col])}", axis=1)
-
-        # Rename columns
-        new_df = new_df.rename(columns={query_col: "Keyword"})
-
-        # Keep only relevant columns (removes original numeric column)
-        new_df = new_df[["Keyword", "Search Interest"]]
-
-        return new_df
-
     # **📊 Display Four Wider Tables in 2 Rows with Sorted Data**
     st.markdown("### 🔍 Search Insights Breakdown")
 
@@ -351,33 +489,21 @@ with tab3:
 
     with col_t1:
         st.subheader("🔝 Top Queries")
-        top_queries_df = related_queries_df[related_queries_df["category"] == "TOP"]
 
         if not top_queries_df.empty:
             st.dataframe(create_df_with_bar(top_queries_df, "relatedquery", "interest"), hide_index=True, use_container_width=True)
 
             # ✅ AI Insight with "Add to Designer" button
-            top_query = top_queries_df.nlargest(1, "interest")["relatedquery"].values[0]
-            insight_top_query = get_gemini_insight(
-                "Top Searched Queries",
-                f"The most searched query is **{top_query}**, reflecting high interest in this topic."
-            )
-            display_ai_insight(insight_top_query, "Top_Query")
+            display_ai_insight(insights["Top Searched Queries"], "Top_Query")
 
     with col_t2:
         st.subheader("🚀 Rising Queries")
-        rising_queries_df = related_queries_df[related_queries_df["category"] == "RISING"]
 
         if not rising_queries_df.empty:
             st.dataframe(create_df_with_bar(rising_queries_df, "relatedquery", "searchfreqinc"), hide_index=True, use_container_width=True)
 
             # ✅ AI Insight with "Add to Designer" button
-            fastest_rising_query = rising_queries_df.nlargest(1, "searchfreqinc")["relatedquery"].values[0]
-            insight_rising_query = get_gemini_insight(
-                "Fastest Growing Queries",
-                f"The fastest-growing search term is **{fastest_rising_query}**, showing a recent surge in interest."
-            )
-            display_ai_insight(insight_rising_query, "Rising_Query")
+            display_ai_insight(insights["Fastest Growing Queries"], "Rising_Query")
 
     st.write("---")
 
@@ -386,33 +512,21 @@ with tab3:
 
     with col_t3:
         st.subheader("🏆 Top Related Topics")
-        top_topics_df = related_entities_df[related_entities_df["category"] == "TOP"]
 
         if not top_topics_df.empty:
             st.dataframe(create_df_with_bar(top_topics_df, "relatedtopic", "interest"), hide_index=True, use_container_width=True)
 
             # ✅ AI Insight with "Add to Designer" button
-            top_related_topic = top_topics_df.nlargest(1, "interest")["relatedtopic"].values[0]
-            insight_top_topic = get_gemini_insight(
-                "Top Related Topics",
-                f"The most associated topic is **{top_related_topic}**, indicating strong relevance to the main search trends."
-            )
-            display_ai_insight(insight_top_topic, "Top_Topic")
+            display_ai_insight(insights["Top Related Topics"], "Top_Topic")
 
     with col_t4:
         st.subheader("📈 Fastest Growing Topics")
-        rising_topics_df = related_entities_df[related_entities_df["category"] == "RISING"]
 
         if not rising_topics_df.empty:
             st.dataframe(create_df_with_bar(rising_topics_df, "relatedtopic", "searchfreqinc"), hide_index=True, use_container_width=True)
 
             # ✅ AI Insight with "Add to Designer" button
-            fastest_growing_topic = rising_topics_df.nlargest(1, "searchfreqinc")["relatedtopic"].values[0]
-            insight_rising_topic = get_gemini_insight(
-                "Fastest Growing Topics",
-                f"The fastest-growing topic is **{fastest_growing_topic}**, showing a sharp increase in search volume."
-            )
-            display_ai_insight(insight_rising_topic, "Rising_Topic")
+            display_ai_insight(insights["Fastest Growing Topics"], "Rising_Topic")
 
     st.write("---")
 
@@ -428,5 +542,75 @@ with tab4:
 
     st.write("---")
 
+# Tab 5: All Keywords
+with tab5:
+    st.markdown("## 📋 All Keywords")
+
+    # ✅ One vectorized pass over every keyword, memoized on the (data-version cached) index
+    keyword_summary = keyword_index.summary()
+
+    if keyword_summary.empty:
+        st.info("No keyword data available yet.")
+    else:
+        st.caption(f"{len(keyword_summary):,} keywords · week-over-week compares each keyword's last 7 days with the 7 days before")
+        st.dataframe(
+            keyword_summary.drop(columns=["latest_time"]).rename_axis("Keyword").reset_index(),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "peak_time": st.column_config.TextColumn("Peak Time"),
+                "peak": st.column_config.NumberColumn("Peak", format="%d"),
+                "mean": st.column_config.NumberColumn("Average", format="%.1f"),
+                "latest": st.column_config.NumberColumn("Latest", format="%d"),
+                "wow_growth": st.column_config.NumberColumn("WoW Growth", format="%+.1f%%"),
+                "volatility": st.column_config.NumberColumn("Volatility", format="%.1f", help="Standard deviation of interest"),
+                "points": st.column_config.NumberColumn("Data Points", format="%d"),
+            },
+        )
+
+    st.write("---")
+
+    # **🔗 Keywords that move together**
+    st.markdown("### 🔗 Keywords That Move Together")
+    correlations = get_keyword_correlations(data_version, multi_timeline_df)
+
+    if correlations["correlation"].empty:
+        st.info("Need at least two keywords with enough history to compare.")
+    else:
+        col_heat, col_pairs = st.columns([3, 2])
+
+        with col_heat:
+            corr = correlations["correlation"].iloc[:HEATMAP_KEYWORDS, :HEATMAP_KEYWORDS]
+            fig = px.imshow(
+                corr,
+                zmin=-1,
+                zmax=1,
+                color_continuous_scale="RdBu_r",
+                title="Correlation of Search Interest",
+                labels={"color": "Correlation"},
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        with col_pairs:
+            st.markdown("#### ⏩ Leaders & Followers")
+            pairs = correlations["pairs"]
+            if pairs.empty:
+                st.info("No keyword clearly leads another yet.")
+            else:
+                unit = "hours" if correlations["freq"] == "h" else "days"
+                st.dataframe(
+                    pairs,
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={
+                        "leader": st.column_config.TextColumn("Leader"),
+                        "follower": st.column_config.TextColumn("Follower"),
+                        "lead": st.column_config.NumberColumn(f"Leads By ({unit})", format="%d"),
+                        "correlation": st.column_config.NumberColumn("Correlation", format="%.2f"),
+                    },
+                )
+
+    st.write("---")
+
 st.write("---")
 st.markdown("<p style='text-align: center;'>🚀 Use these insights to create AI-powered hairstyles & marketing plans!</p>", unsafe_allow_html=True)
\ No newline at end of file
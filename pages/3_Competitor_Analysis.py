@@ -1,73 +1,63 @@
 import streamlit as st
 import pandas as pd
 import os
-from supabase import create_client
-from dotenv import load_dotenv
 import plotly.express as px
-from utils import display_ai_insight, save_to_designer, get_gemini_insight  # ✅ Import functions
-from urllib.parse import urlparse
+from utils import display_ai_insight, save_to_designer, stream_gemini_insight, display_ai_insight_stream, get_table_version, load_versioned, supabase  # ✅ Import functions
 import re
 from PIL import Image
-
-# ✅ Load environment variables from .env
-load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-# ✅ Initialize Supabase client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# ✅ Fetch Outre Product Data
-@st.cache_data
-def fetch_outre_products():
-    """Fetch Outre product data from Supabase."""
-    try:
-        response = supabase.table("brd_outre_products").select(
-            "name, link, modified, date, product_description, category, subcategory, quantity, length, image_url"
-        ).execute()
-        return pd.DataFrame(response.data)
-    except Exception as e:
-        st.error(f"⚠️ Error fetching Outre data: {e}")
-        return pd.DataFrame()
+from table_format import create_df_with_bar
+from frame_schema import normalize_frame
+from kpi_queries import outre_counts, outre_kpis, outre_listing, outre_options
+
+# ✅ Outre data served by Supabase (see kpi_queries.py): filter options, KPIs and counts come
+# from RPCs and listings are filtered and paged on the server, so the table is never downloaded.
+# Each loader raises on failure (nothing is cached) and is cached per filters + table version.
+@st.cache_data(max_entries=64, show_spinner=False)
+def fetch_outre_options(dimension, version=None):
+    """Distinct subcategories or lengths for the filter widgets."""
+    return outre_options(supabase, dimension)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def fetch_outre_kpis(subcategories=(), lengths=(), name_search="", version=None):
+    """Total products, most common subcategory and latest modified date for the current filters."""
+    return outre_kpis(supabase, subcategories, lengths, name_search)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def fetch_outre_counts(dimension, subcategories=(), lengths=(), name_search="", version=None):
+    """Product counts per subcategory or length for the current filters, most common first."""
+    return outre_counts(supabase, dimension, subcategories, lengths, name_search)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def fetch_outre_listing(subcategories=(), lengths=(), name_search="", page=1, page_size=50, version=None):
+    """One page of matching products and the total number of matches."""
+    df, total = outre_listing(supabase, subcategories, lengths, name_search, (page - 1) * page_size, page_size)
+    return normalize_frame(df, "brd_outre_products"), total
+
+def page_controls(total, page_size, key):
+    """Previous/Next buttons kept in session_state[key]; returns the current page (1-based)."""
+    total_pages = max(1, (total + page_size - 1) // page_size)
+    st.session_state[key] = min(max(1, st.session_state.get(key, 1)), total_pages)  # filters may shrink the result
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+
+    with col_prev:
+        if st.button("⬅️ Previous", key=f"{key}_prev", disabled=(st.session_state[key] <= 1)):
+            st.session_state[key] -= 1
+
+    with col_next:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=(st.session_state[key] >= total_pages)):
+            st.session_state[key] += 1
+
+    with col_page:
+        st.markdown(f"<div style='text-align:center; padding-top:7px;'>Page {st.session_state[key]} of {total_pages}</div>", unsafe_allow_html=True)
+
+    return st.session_state[key]
 
 # ✅ Page Configuration
 st.set_page_config(page_title="Competitor Analysis", page_icon="🏆", layout="wide")
 
 st.markdown("<h1 style='text-align: center;'>🏆 Competitor Analysis</h1>", unsafe_allow_html=True)
 
-# ✅ Function to Create Dataframe with Quantity Bar + Sorting
-def create_df_with_bar(df, query_col, value_col):
-    if df is None or df.empty:
-        return pd.DataFrame()
-
-    # Keep only necessary columns
-    new_df = df[[query_col, value_col]].copy()
-
-    # Convert to numeric and fill missing values
-    new_df[value_col] = pd.to_numeric(new_df[value_col], errors='coerce').fillna(0)
-
-    # **Sort in Descending Order**
-    new_df = new_df.sort_values(by=value_col, ascending=False)
-
-    # Create visual bar column
-    max_for_bar = 100
-    scale_length = 20  # Controls bar length
-
-    def get_bar(v):
-        clamped = min(v, max_for_bar)
-        bar_len = int(round((clamped / max_for_bar) * scale_length))
-        return '█' * bar_len
-
-    new_df["Quantity"] = new_df.apply(lambda row: f"{row[value_col]} {get_bar(row[value_col])}", axis=1)
-
-    # Rename columns
-    new_df = new_df.rename(columns={query_col: "Keyword"})
-
-    # Keep only relevant columns
-    new_df = new_df[["Keyword", "Quantity"]]
-
-    return new_df
-
 # ✅ Main App
 with st.container():
     # ✅ Competitor Tabs
@@ -127,8 +117,16 @@ with st.container():
 
         with outre_tabs[1]: # All other information in Outre
             #Fetch Data
-            df = fetch_outre_products()
-            if df.empty:
+            outre_version = get_table_version("brd_outre_products", "modified")
+            try:
+                # Headline KPIs over the whole table + the filter options
+                kpis = load_versioned(fetch_outre_kpis, outre_version, (), (), "")
+                subcategory_options = load_versioned(fetch_outre_options, outre_version, "subcategory")
+                length_options = load_versioned(fetch_outre_options, outre_version, "length")
+            except Exception as e:
+                st.error(f"⚠️ Error fetching Outre data: {e}")
+                st.stop()
+            if kpis["total_products"] == 0:
                 st.error("⚠️ No data found in Supabase.")
                 st.stop()
 
@@ -139,32 +137,31 @@ with st.container():
             with col_f1:
                 selected_subcategories = st.multiselect(
                     "📌 Select Subcategories",
-                    options=sorted(df["subcategory"].dropna().unique()),
+                    options=subcategory_options,
                     default=[]
                 )
 
             with col_f2:
                 selected_lengths = st.multiselect(
                     "📏 Select Length",
-                    options=sorted(df["length"].dropna().unique()),
+                    options=length_options,
                     default=[]
                 )
 
-            search_name = st.multiselect(
-                "🔍 Search Product Name",
-                options=sorted(df["name"].dropna().unique()),
-                default=[]
-            )
-
-            # Apply Filters
-            filtered_df = df.copy()
-            if selected_subcategories:
-                filtered_df = filtered_df[filtered_df["subcategory"].isin(selected_subcategories)]
-            if selected_lengths:
-                filtered_df = filtered_df[filtered_df["length"].isin(selected_lengths)]
-            # Apply Filter
-            if search_name:
-                filtered_df = filtered_df[filtered_df["name"].isin(search_name)]
+            search_name = st.text_input("🔍 Search Product Name", placeholder="Part of a product name")
+
+            # Apply Filters on the server (mode = first row of the counts)
+            product_filters = (tuple(selected_subcategories), tuple(selected_lengths), search_name.strip())
+            try:
+                filtered_kpis = load_versioned(fetch_outre_kpis, outre_version, *product_filters)
+                subcategory_df = load_versioned(fetch_outre_counts, outre_version, "subcategory", *product_filters)
+                length_df = load_versioned(fetch_outre_counts, outre_version, "length", *product_filters)
+            except Exception as e:
+                st.error(f"⚠️ Error fetching Outre data: {e}")
+                st.stop()
+            filtered_total = filtered_kpis["total_products"]
+            filtered_subcat_mode = subcategory_df["subcategory"].iloc[0] if not subcategory_df.empty else None
+            filtered_length_mode = length_df["length"].iloc[0] if not length_df.empty else None
 
             st.write("---")
 
@@ -174,7 +171,7 @@ with st.container():
             col_m1, col_m2, col_m3, col_m4 = st.columns([3, 3, 3, 1])  # Add extra column for save button
 
             # 📦 Total Products
-            total_products = len(df)
+            total_products = kpis["total_products"]
             col_m1.markdown(f"""
                 <div style="text-align: center; background-color: #f8f9fa; padding: 12px; border-radius: 8px; border: 1px solid #ddd;">
                     <h5 style="margin-bottom: 5px;">📦 Total Products</h5>
@@ -183,8 +180,8 @@ with st.container():
             """, unsafe_allow_html=True)
 
             # 📌 Most Common Subcategory
-            if not df.empty:
-                most_common_subcat = df["subcategory"].mode()[0]
+            if total_products:
+                most_common_subcat = kpis["most_common_subcategory"]
                 col_m2.markdown(f"""
                     <div style="text-align: center; background-color: #f8f9fa; padding: 12px; border-radius: 8px; border: 1px solid #ddd;">
                         <h5 style="margin-bottom: 5px;">📌 Most Common Subcategory</h5>
@@ -193,8 +190,8 @@ with st.container():
                 """, unsafe_allow_html=True)
 
             # 📆 Latest Product Added
-            if not df.empty:
-                latest_product_date = df["modified"].max()  # Use modified date for latest product
+            if total_products:
+                latest_product_date = kpis["latest_modified"]  # Use modified date for latest product
                 col_m3.markdown(f"""
                     <div style="text-align: center; background-color: #f8f9fa; padding: 12px; border-radius: 8px; border: 1px solid #ddd;">
                         <h5 style="margin-bottom: 5px;">📆 Latest Product Added</h5>
@@ -217,104 +214,67 @@ with st.container():
             #✅ **Charts Section**
             st.markdown("## 📊 Product Distribution")
 
-            # ✅ Function to Create Dataframe with Quantity Bar + Sorting
-            def create_df_with_bar(df, query_col, value_col):
-                if df is None or df.empty:
-                    return pd.DataFrame()
-
-                # Keep only necessary columns
-                new_df = df[[query_col, value_col]].copy()
-
-                # Convert to numeric and fill missing values
-                new_df[value_col] = pd.to_numeric(new_df[value_col], errors='coerce').fillna(0)
-
-                # **Sort in Descending Order**
-                new_df = new_df.sort_values(by=value_col, ascending=False)
-
-                # Create visual bar column
-                max_for_bar = 100
-                scale_length = 20  # Controls bar length
-
-                def get_bar(v):
-                    clamped = min(v, max_for_bar)
-                    bar_len = int(round((clamped / max_for_bar) * scale_length))
-                    return '█' * bar_len
-
-                new_df["Quantity"] = new_df.apply(lambda row: f"{row[value_col]} {get_bar(row[value_col])}", axis=1)
-
-                # Rename columns
-                new_df = new_df.rename(columns={query_col: "Keyword"})
-
-                # Keep only relevant columns
-                new_df = new_df[["Keyword", "Quantity"]]
-
-                return new_df
-
             #**Row: Products by Subcategory & Products by Length**
             col_chart1, col_chart2, col_chart3 = st.columns([4, 4, 1])  # Add extra column for save button
 
             #**Products by Subcategory**
             with col_chart1:
                 st.subheader("📌 Products by Subcategory")
-                if not filtered_df.empty:
-                    subcategory_df = filtered_df["subcategory"].value_counts().reset_index()
-                    subcategory_df.columns = ["subcategory", "count"]
+                if filtered_total:
                     # Apply Bar Visualization
-                    st.dataframe(create_df_with_bar(subcategory_df, "subcategory", "count"), hide_index=True, use_container_width=True)
+                    st.dataframe(create_df_with_bar(subcategory_df, "subcategory", "count", label="Quantity"), hide_index=True, use_container_width=True)
 
             #**Products by Length**
             with col_chart2:
                 st.subheader("📏 Products by Length")
-                if not filtered_df.empty:
-                    length_df = filtered_df["length"].value_counts().reset_index()
-                    length_df.columns = ["length", "count"]
+                if filtered_total:
                     # Apply Bar Visualization
-                    st.dataframe(create_df_with_bar(length_df, "length", "count"), hide_index=True, use_container_width=True)
+                    st.dataframe(create_df_with_bar(length_df, "length", "count", label="Quantity"), hide_index=True, use_container_width=True)
 
             # ✅ Save Button for Charts
             with col_chart3:
                 if st.button("➕", help="Add Product Insights to Designer", key="btn_product_insights"):
                     insight_charts = f"""
-                    - **Most Common Subcategory:** {filtered_df["subcategory"].mode()[0]}
-                    - **Most Common Length:** {filtered_df["length"].mode()[0]}
-                    - **Total Products:** {len(filtered_df)}
+                    - **Most Common Subcategory:** {filtered_subcat_mode}
+                    - **Most Common Length:** {filtered_length_mode}
+                    - **Total Products:** {filtered_total}
                     """
                     save_to_designer(insight_charts)
 
             # ✅ **AI Insight Below Charts**
-            if not filtered_df.empty:
+            if filtered_total:
                 # Generate dataset summary
                 dataset_summary = f"""
-                - **Most Common Subcategory:** {filtered_df["subcategory"].mode()[0]}
-                - **Most Common Length:** {filtered_df["length"].mode()[0]}
-                - **Total Products:** {len(filtered_df)}
+                - **Most Common Subcategory:** {filtered_subcat_mode}
+                - **Most Common Length:** {filtered_length_mode}
+                - **Total Products:** {filtered_total}
                 """
 
-                # ✅ Get AI-generated insights from Gemini
-                ai_insight = get_gemini_insight("Product Insights", dataset_summary)
-
-                # ✅ Display AI-generated insight with save button
-                col_ai1, col_ai2 = st.columns([5, 1])  # Layout for insight and button
-
-                with col_ai1:
-                    st.info(ai_insight)  # ✅ Display AI-generated insight
-
-                with col_ai2:
-                    tooltip = "Add this AI insight to the designer for later use"
-                    if st.button("➕", help=tooltip, key="btn_Product_Insights"):  # Unique key
-                        save_to_designer(ai_insight)  # Save to DB when clicked
+                # ✅ Stream AI-generated insights from Gemini with save button
+                ai_insight = display_ai_insight_stream(
+                    stream_gemini_insight("Product Insights", dataset_summary),
+                    "Product_Insights"
+                )
 
             st.write("---")
 
         with outre_tabs[2]: # Product Listings
-            #✅ **Product Listings (Showing 5 at a time)**
+            #✅ **Product Listings (one server-side page at a time)**
             st.markdown("## 🏷️ Product Listings")
 
+            LISTING_PAGE_SIZE = 50  # rows per listing page
+            listing_page = page_controls(filtered_total, LISTING_PAGE_SIZE, "listing_page")
+            try:
+                listing_df, _ = load_versioned(fetch_outre_listing, outre_version, *product_filters, listing_page, LISTING_PAGE_SIZE)
+            except Exception as e:
+                st.error(f"⚠️ Error fetching Outre data: {e}")
+                listing_df = pd.DataFrame(columns=["name", "subcategory", "quantity", "length", "link"])
+
             col_l1, col_l2 = st.columns([2.5, 0.5])
 
             with col_l1:
                 # Capitalize the first letter of each column name
-                formatted_df = filtered_df.rename(columns=lambda x: x.capitalize())
+                formatted_df = listing_df.rename(columns=lambda x: x.capitalize())
 
                 # Display the DataFrame with updated column names
                 st.dataframe(formatted_df[["Name", "Subcategory", "Quantity", "Length", "Link"]], use_container_width=True, hide_index=True, height=250)
@@ -322,52 +282,22 @@ with st.container():
             #✅ **Save Button Next to Product Listings**
             with col_l2:
                 if st.button("➕", help="Add insight on Product Listings to Designer"):
-                    insight = f"There are {len(filtered_df)} products available. The latest product was added on {filtered_df['modified'].max()}."
+                    insight = f"There are {filtered_total} products available. The latest product was added on {filtered_kpis['latest_modified']}."
                     save_to_designer(insight)
 
             #✅ **AI Insight Below Product Listings**
-            if not filtered_df.empty:
+            if filtered_total:
                 ai_product_insight = f"""
-                - **Total Products:** {len(filtered_df)}
-                - **Latest Product Added On:** {filtered_df["modified"].max()}
+                - **Total Products:** {filtered_total}
+                - **Latest Product Added On:** {filtered_kpis["latest_modified"]}
                 """
                 display_ai_insight(ai_product_insight, "Product Listings")
 
             st.write("---")
 
-            #✅ Fetch products from Supabase
-
-            @st.cache_data
-            def fetch_products():
-                try:
-                    response = supabase.table("brd_outre_products").select("*").execute()
-                    df = pd.DataFrame(response.data) if response.data else pd.DataFrame()
-
-                    #✅ Convert column names to lowercase to avoid KeyErrors
-                    df.columns = df.columns.str.lower()
-
-                    #✅ Extract filenames from image_url
-                    df["image_filename"] = df["image_url"].apply(lambda x: os.path.basename(urlparse(x).path) if pd.notna(x) else None)
-
-                    return df
-                except Exception as e:
-                    st.error(f"Error fetching data: {e}")
-                    return pd.DataFrame()
-
-            #✅ Initialize Supabase client
-            supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
             # **📁 Local Image Folder**
             IMAGE_FOLDER = "OutreProductImages"
 
-            # **🔄 Load Products**
-            df = fetch_products()
-
-            # **Ensure 'name' column exists before using it**
-            if "name" not in df.columns:
-                st.error("⚠️ 'name' column not found in Supabase data. Check column names!")
-                st.stop()  # Stop execution if 'name' column is missing
-
             # **Match Image Filenames with Local Files**
             def get_local_image_path(image_filename):
                 """Finds the corresponding image file in OutreProductImages folder."""
@@ -383,51 +313,28 @@ with st.container():
             col_f1, col_f2, col_f3 = st.columns(3)
 
             with col_f1:
-                search_name = st.selectbox("🔍 Search Product Name", ["All"] + df["name"].dropna().unique().tolist())
+                browse_name = st.text_input("🔍 Search Product Name", key="browse_name", placeholder="Part of a product name")
 
             with col_f2:
-                search_subcategory = st.multiselect("📂 Filter by Subcategory", df["subcategory"].dropna().unique().tolist())
+                search_subcategory = st.multiselect("📂 Filter by Subcategory", subcategory_options)
 
             with col_f3:
-                search_length = st.multiselect("📏 Filter by Length", df["length"].dropna().unique().tolist())
-
-            # **Apply Filters**
-            filtered_df = df.copy()
+                search_length = st.multiselect("📏 Filter by Length", length_options)
 
-            if search_name != "All":
-                filtered_df = filtered_df[filtered_df["name"] == search_name]
-
-            if search_subcategory:
-                filtered_df = filtered_df[filtered_df["subcategory"].isin(search_subcategory)]
-
-            if search_length:
-                filtered_df = filtered_df[filtered_df["length"].isin(search_length)]
+            # **Apply Filters on the server**
+            browse_filters = (tuple(search_subcategory), tuple(search_length), browse_name.strip())
 
             # **🔄 Pagination Setup**
             PAGE_SIZE = 12  # Number of products per page
-            if "current_page" not in st.session_state:
-                st.session_state["current_page"] = 1
-
-            total_pages = max(1, (len(filtered_df) + PAGE_SIZE - 1) // PAGE_SIZE)
-
-            # **⬅️ Pagination Buttons ➡️**
-            col_prev, col_page, col_next = st.columns([1, 2, 1])
-
-            with col_prev:
-                if st.button("⬅️ Previous", disabled=(st.session_state["current_page"] <= 1)):
-                    st.session_state["current_page"] -= 1
-
-            with col_page:
-                st.markdown(f"<div style='text-align:center; padding-top:7px;'>Page {st.session_state['current_page']} of {total_pages}</div>", unsafe_allow_html=True)
-
-            with col_next:
-                if st.button("Next ➡️", disabled=(st.session_state["current_page"] >= total_pages)):
-                    st.session_state["current_page"] += 1
-
-            # **📌 Get current page items**
-            start_idx = (st.session_state["current_page"] - 1) * PAGE_SIZE
-            end_idx = start_idx + PAGE_SIZE
-            page_items = filtered_df.iloc[start_idx:end_idx]
+            try:
+                browse_total = load_versioned(fetch_outre_kpis, outre_version, *browse_filters)["total_products"]
+                current_page = page_controls(browse_total, PAGE_SIZE, "current_page")
+
+                # **📌 Get current page items**
+                page_items, _ = load_versioned(fetch_outre_listing, outre_version, *browse_filters, current_page, PAGE_SIZE)
+            except Exception as e:
+                st.error(f"Error fetching data: {e}")
+                page_items = pd.DataFrame(columns=["name", "link"])
 
             # Remove image related code
 
@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import os
 import plotly.express as px
-from utils import get_gemini_insight, save_to_designer
+from utils import stream_gemini_insight, display_ai_insight_stream
 from fpdf import FPDF  # ✅ PDF Export
 
 # ✅ Set Page Configuration
@@ -133,18 +133,15 @@ if st.session_state.show_comparison:
         # ✅ **🔥 AI-Generated Competitive Insights**
         st.markdown("### 🤖 AI-Generated Competitive Insights")
 
-        ai_insight = get_gemini_insight(
-            f"{st.session_state.competitor_1} vs. {st.session_state.competitor_2} Hair Market Analysis",
-            f"Compare {st.session_state.competitor_1} and {st.session_state.competitor_2} in terms of market strategy, product positioning, pricing, and consumer appeal. Highlight key differentiators."
+        # ✅ Stream the AI-generated insight into the panel as it is produced
+        ai_insight = display_ai_insight_stream(
+            stream_gemini_insight(
+                f"{st.session_state.competitor_1} vs. {st.session_state.competitor_2} Hair Market Analysis",
+                f"Compare {st.session_state.competitor_1} and {st.session_state.competitor_2} in terms of market strategy, product positioning, pricing, and consumer appeal. Highlight key differentiators."
+            ),
+            "competitor_ai"
         )
 
-        col_ai1, col_ai2 = st.columns([5, 1])
-        with col_ai1:
-            st.info(ai_insight)  # ✅ Display AI-generated insight
-        with col_ai2:
-            if st.button("➕", help="Add this insight to Designer", key="btn_competitor_ai"):
-                save_to_designer(ai_insight)
-
         st.write("---")
 
         # ✅ **Export to PDF**  (Move to AI Insights tab)
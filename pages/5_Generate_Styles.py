@@ -1,28 +1,23 @@
 import streamlit as st
 import os
 import random
-import google.generativeai as genai
-from utils import save_to_designer, get_gemini_insight, generate_image, save_to_mydesigns  # Import AI & Save functions
+from utils import save_to_designer, get_gemini_insight, generate_image, save_to_mydesigns, run_concurrently, generate_text, get_supabase_db  # Import AI & Save functions
 import base64  # Import base64
 from fpdf import FPDF
-from supabase import create_client, Client
 import uuid  # Import UUID for unique filenames
+from functools import partial
 
 # ✅ Set Page Config
 st.set_page_config(page_title="Generate Hairstyles", page_icon="🎨", layout="wide")
 
-# Configure the Gemini API key (ensure GEMINI_API_KEY exists in your .env file)
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-2.0-flash')
-
 # Supabase settings (replace with your actual credentials)
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 BUCKET_NAME = "hairstyle_images"  # the name of your storage bucket
 
-# Initialize Supabase client
+# Shared Supabase client (one pooled client per process)
 if SUPABASE_URL and SUPABASE_KEY:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase = get_supabase_db()
 else:
     st.error("Supabase URL and Key not found in environment variables.")
 
@@ -33,8 +28,7 @@ def get_image_prompt(design_name, target_demographic, length, color, braid_type,
     insights_text = "\nInclude these key trend insights:\n" + "\n".join(f"- {insight}" for insight in selected_insights) if selected_insights else ""
     prompt = f"""Create a detailed image generation prompt for a braid style that is:\n- Design Name: {design_name}\n- Target Demographic: {target_demographic}\n- Length: {length}\n- Color: {color}\n- Braid Type: {braid_type}\n- Style Notes: {custom_style if custom_style else 'Clean and natural style'}\n{insights_text}\nFocus on visual details, less than 100 words for a stable diffusion image generator."""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(prompt)
     except Exception as e:
         return f"Error generating image generation prompt: {str(e)}"
 
@@ -44,8 +38,7 @@ def get_design_look_and_feel(design_name, target_demographic, length, color, bra
     insights_text = "\nIncorporate these insights:\n" + "\n".join(f"- {insight}" for insight in selected_insights) if selected_insights else ""
     prompt = f"""Describe the overall look and feel for braid style {design_name} with these characteristics: \nDemographic: {target_demographic}, Length: {length}, Color: {color}, Braid Type: {braid_type}, Custom Style: {custom_style}.\n{insights_text}\nFocus on aspects that describe the overall aesthetic of the design."""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(prompt)
     except Exception as e:
         return f"Error generating look and feel: {str(e)}"
 
@@ -55,8 +48,7 @@ def get_marketing_plan(design_name, target_demographic, length, color, braid_typ
     insights_text = "\nLeverage these insights in the marketing:\n" + "\n".join(f"- {insight}" for insight in selected_insights) if selected_insights else ""
     prompt = f"""Marketing plan for braid style {design_name}, demographic {target_demographic}, with the following attributes: Length {length}, Color {color}, Braid Type: {braid_type}, Custom Style: {custom_style}.\n{insights_text}\nInclude target channels, key messages, and promotional ideas."""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(prompt)
     except Exception as e:
         return f"Error generating marketing plan: {str(e)}"
 
@@ -66,8 +58,7 @@ def get_packaging_plan(design_name, target_demographic, length, color, braid_typ
     insights_text = "\nConsider these insights for packaging design:\n" + "\n".join(f"- {insight}" for insight in selected_insights) if selected_insights else ""
     prompt = f"""Packaging plan for braid style {design_name}, demographic {target_demographic}, characterized by Length: {length}, Color: {color}, Braid Type: {braid_type}, Custom Style: {custom_style}.\n{insights_text}\nInclude packaging materials, design elements, and sustainability considerations."""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(prompt)
     except Exception as e:
         return f"Error generating packaging plan: {str(e)}"
 
@@ -77,8 +68,7 @@ def get_manufacturing_costs(design_name, target_demographic, length, color, brai
     insights_text = "\nIncorporate these insights into cost considerations:\n" + "\n".join(f"- {insight}" for insight in selected_insights) if selected_insights else ""
     prompt = f"""Manufacturing costs for braid style {design_name}: Demographic: {target_demographic}, Length: {length}, Color: {color}, Braid Type: {braid_type}, Custom Style: {custom_style}.\n{insights_text}\nDetail materials, labor, and overhead costs."""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(prompt)
     except Exception as e:
         return f"Error generating manufacturing costs: {str(e)}"
 
@@ -88,8 +78,7 @@ def get_customer_costs(design_name, target_demographic, length, color, braid_typ
     insights_text = "\nConsider these insights for customer pricing:\n" + "\n".join(f"- {insight}" for insight in selected_insights) if selected_insights else ""
     prompt = f"""Customer costs for braid style {design_name}: Demographic: {target_demographic}, Length: {length}, Color: {color}, Braid Type: {braid_type}, Custom Style: {custom_style}.\n{insights_text}\nDetail product price, installation fees, maintenance costs."""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(prompt)
     except Exception as e:
         return f"Error generating customer costs: {str(e)}"
 
@@ -99,8 +88,7 @@ def get_formulation_details(design_name, target_demographic, length, color, brai
     insights_text = "\nAddress these insights in the formulation details:\n" + "\n".join(f"- {insight}" for insight in selected_insights) if selected_insights else ""
     prompt = f"""Outline the formulation details for braid style: {design_name}. Take into account: Demographic: {target_demographic}, Length: {length}, Color: {color}, Braid Type: {braid_type}, Custom Style: {custom_style}.\n{insights_text}"""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(prompt)
     except Exception as e:
         return f"Error generating formulation details: {str(e)}"
 
@@ -110,11 +98,34 @@ def get_design_visuals(design_name, target_demographic, length, color, braid_typ
     insights_text = "\nDraw inspiration from these insights for the design visuals:\n" + "\n".join(f"- {insight}" for insight in selected_insights) if selected_insights else ""
     prompt = f"""Outline the visual inspiration for the design: {design_name} by taking into account: Demographic: {target_demographic}, Length: {length}, Color: {color}, Braid Type: {braid_type}, Custom Style: {custom_style}.\n{insights_text}"""
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        return generate_text(prompt)
     except Exception as e:
         return f"Error generating visuals: {str(e)}"
 
+# Design-plan sections generated after "Generate Hairstyle" (session state key -> generator).
+# Each generator keeps its own st.cache_data entry; they are fanned out concurrently below.
+PLAN_GENERATORS = {
+    "look_and_feel": get_design_look_and_feel,
+    "marketing_plan": get_marketing_plan,
+    "packaging_plan": get_packaging_plan,
+    "manufacturing_costs": get_manufacturing_costs,
+    "customer_costs": get_customer_costs,
+    "formulation_details": get_formulation_details,
+    "design_visuals": get_design_visuals,
+}
+
+# Max Gemini requests in flight at once (set PLAN_GENERATION_CONCURRENCY to throttle).
+PLAN_CONCURRENCY = int(os.getenv("PLAN_GENERATION_CONCURRENCY", len(PLAN_GENERATORS)))
+
+def generate_design_plans(design_name, target_demographic, length, color, braid_type, custom_style, selected_insights, max_workers=PLAN_CONCURRENCY):
+    """Generate every design-plan section concurrently; wall time is roughly the slowest single call."""
+    args = (design_name, target_demographic, length, color, braid_type, custom_style, selected_insights)
+    tasks = {key: partial(generator, *args) for key, generator in PLAN_GENERATORS.items()}
+    results, errors = run_concurrently(tasks, max_workers=max_workers)
+    for key, e in errors.items():
+        results[key] = f"Error generating {key.replace('_', ' ')}: {str(e)}"
+    return results
+
 def create_pdf_report(title, content):
     """Create a PDF report from a title and content."""
     pdf = FPDF()
@@ -420,14 +431,10 @@ with st.container():
                     ))  # Append to saved hairstyles
                     st.success("✅ Hairstyle generated!")
 
-                # Generate additional results
-                st.session_state.look_and_feel = get_design_look_and_feel(design_name, demographic, length, selected_color, braid_type, custom_style, selected_insights)
-                st.session_state.marketing_plan = get_marketing_plan(design_name, demographic, length, selected_color, braid_type, custom_style, selected_insights)
-                st.session_state.packaging_plan = get_packaging_plan(design_name, demographic, length, selected_color, braid_type, custom_style, selected_insights)
-                st.session_state.manufacturing_costs = get_manufacturing_costs(design_name, demographic, length, selected_color, braid_type, custom_style, selected_insights)
-                st.session_state.customer_costs = get_customer_costs(design_name, demographic, length, selected_color, braid_type, custom_style, selected_insights)
-                st.session_state.formulation_details = get_formulation_details(design_name, demographic, length, selected_color, braid_type, custom_style, selected_insights)
-                st.session_state.design_visuals = get_design_visuals(design_name, demographic, length, selected_color, braid_type, custom_style, selected_insights)
+                # Generate additional results (all sections in parallel)
+                plans = generate_design_plans(design_name, demographic, length, selected_color, braid_type, custom_style, selected_insights)
+                for key, text in plans.items():
+                    st.session_state[key] = text
 
     st.write("---")
 
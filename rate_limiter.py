@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+# Process-wide request budget for Google Trends. Every TrendsClient shares the
+# bucket below, so concurrent page sessions, fetch_many workers and the refresh
+# scheduler together never exceed the configured rate.
+TRENDS_RATE_PER_MINUTE = float(os.getenv("TRENDS_RATE_PER_MINUTE", 30))
+TRENDS_BURST = int(os.getenv("TRENDS_BURST", 5))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to `capacity`.
+
+    acquire() blocks until a token is available, so callers are spaced out instead
+    of being rejected.
+    """
+
+    def __init__(self, rate, capacity):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0  # total seconds callers spent waiting, for monitoring
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` if available right now; return whether it succeeded."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until `tokens` are available and take them.
+
+        Returns False if `timeout` seconds pass first, True otherwise.
+        """
+        if tokens > self.capacity:
+            raise ValueError("cannot acquire more tokens than the bucket holds")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                if now >= deadline:
+                    return False
+                wait = min(wait, deadline - now)
+            time.sleep(wait)
+            with self._lock:
+                self.waited += wait
+
+
+# Shared by every TrendsClient in this process
+trends_rate_limiter = TokenBucket(TRENDS_RATE_PER_MINUTE / 60.0, TRENDS_BURST)
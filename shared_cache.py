@@ -0,0 +1,288 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Cache shared by every Streamlit replica, so table loads and Gemini replies are
+# computed once per deployment instead of once per process.
+# - SHARED_CACHE_URL picks the backend: "sqlite:///path" (default; replicas on one
+#   host share the file) or "redis://host:port/db" (replicas on several hosts;
+#   needs the optional `redis` package).
+# - DataFrames are stored as Arrow IPC streams, text as UTF-8, anything else pickled.
+#   The exact column dtypes travel in the Arrow metadata, so a cache hit comes back
+#   with the same compact dtypes (string[pyarrow], categoricals) as frame_schema made.
+# - get_or_compute holds a short-lived lock entry per key, so when many replicas
+#   miss the same key at once only one of them computes it and the rest wait for
+#   the result (stampede protection).
+
+DEFAULT_CACHE_URL = "sqlite:///" + os.path.join(".cache", "shared_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 60 * 60           # one hour
+LOCK_TTL_SECONDS = 120                  # a crashed computation frees its key after this long
+WAIT_SECONDS = 60                       # how long a waiting replica polls before computing itself
+POLL_SECONDS = 0.2
+DTYPES_METADATA = b"shared_cache.dtypes"
+
+
+def make_key(*parts):
+    """Stable cache key from JSON-able parts (e.g. a table name, filters and data version)."""
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def encode(value):
+    """Serialize a value: Arrow for DataFrames, UTF-8 for text, pickle otherwise."""
+    if isinstance(value, pd.DataFrame):
+        try:
+            table = pa.Table.from_pandas(value)  # a RangeIndex is kept as metadata, other indexes as columns
+            dtypes = json.dumps({str(col): _dtype_name(dtype) for col, dtype in value.dtypes.items()})
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), DTYPES_METADATA: dtypes.encode("utf-8")})
+            sink = io.BytesIO()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return b"A" + sink.getvalue()
+        except (pa.ArrowException, TypeError, ValueError):
+            pass  # mixed-type object columns Arrow cannot represent
+    if isinstance(value, str):
+        return b"S" + value.encode("utf-8")
+    return b"P" + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _dtype_name(dtype):
+    """dtype as a string astype() understands; str() of any StringDtype is just "string"."""
+    return f"string[{dtype.storage}]" if isinstance(dtype, pd.StringDtype) else str(dtype)
+
+
+def _restore_dtypes(df, metadata):
+    """
+    Re-apply the recorded string dtypes: to_pandas() turns string[pyarrow] into
+    string[python] (categoricals and numeric dtypes already survive the round trip).
+    """
+    if DTYPES_METADATA not in metadata:
+        return df
+    for col, dtype in json.loads(metadata[DTYPES_METADATA]).items():
+        if col in df.columns and dtype.startswith("string") and _dtype_name(df[col].dtype) != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def decode(blob):
+    """Inverse of encode."""
+    tag, payload = blob[:1], blob[1:]
+    if tag == b"A":
+        with pa.ipc.open_stream(payload) as reader:
+            table = reader.read_all()
+        return _restore_dtypes(table.to_pandas(), table.schema.metadata or {})
+    if tag == b"S":
+        return payload.decode("utf-8")
+    return pickle.loads(payload)
+
+
+class SQLiteBackend:
+    """Key -> bytes with per-entry expiry in a SQLite file (WAL, safe across processes)."""
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_shared_cache_expires ON shared_cache (expires_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM shared_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl)
+            )
+            self._conn.execute("DELETE FROM shared_cache WHERE expires_at < ?", (now,))
+            self._conn.commit()
+
+    def add(self, key, value, ttl):
+        """Set only if the key is absent or expired; True if this call stored it."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_cache WHERE key = ? AND expires_at < ?", (key, now))
+            stored = self._conn.execute(
+                "INSERT OR IGNORE INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl)
+            ).rowcount
+            self._conn.commit()
+        return stored == 1
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+
+class RedisBackend:
+    """The same interface on a Redis-protocol server (Redis, Valkey, KeyDB, ...)."""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SHARED_CACHE_URL points to Redis but the `redis` package is not installed") from e
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=max(1, int(ttl)))
+
+    def add(self, key, value, ttl):
+        return bool(self._client.set(key, value, ex=max(1, int(ttl)), nx=True))
+
+    def delete(self, key):
+        self._client.delete(key)
+
+
+def backend_from_url(url):
+    """Backend for a SHARED_CACHE_URL."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported SHARED_CACHE_URL: {url}")
+
+
+class SharedCache:
+    """
+    Typed values with TTLs on a shared backend.
+
+    - A backend error is logged and treated as a miss, so the cache never takes a page down.
+    - `hits` / `misses` count lookups made by this process.
+    """
+
+    def __init__(self, backend, ttl=DEFAULT_TTL_SECONDS, namespace="cache"):
+        self.backend = backend
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache configured from SHARED_CACHE_URL / SHARED_CACHE_TTL."""
+        return cls(
+            backend_from_url(os.getenv("SHARED_CACHE_URL", DEFAULT_CACHE_URL)),
+            ttl=int(os.getenv("SHARED_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        )
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def _read(self, key):
+        try:
+            blob = self.backend.get(self._key(key))
+        except Exception as e:
+            logger.warning("Shared cache read failed: %s", e)
+            return None
+        if blob is None:
+            return None
+        try:
+            return decode(blob)
+        except Exception as e:
+            # Corrupt or written by an incompatible version: drop it so it is recomputed once
+            logger.warning("Shared cache entry could not be decoded, dropping it: %s", e)
+            self._delete(self._key(key))
+            return None
+
+    def _delete(self, raw_key):
+        try:
+            self.backend.delete(raw_key)
+        except Exception as e:
+            logger.warning("Shared cache delete failed: %s", e)
+
+    def _acquire(self, lock_key):
+        """Take a key's lock entry; True if this caller now owns it (or the backend is down)."""
+        try:
+            return self.backend.add(lock_key, b"1", LOCK_TTL_SECONDS)
+        except Exception as e:
+            logger.warning("Shared cache lock failed: %s", e)
+            return True
+
+    def _locked(self, lock_key):
+        try:
+            return self.backend.get(lock_key) is not None
+        except Exception:
+            return False
+
+    def get(self, key):
+        """Cached value, or None on a miss."""
+        value = self._read(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value for `ttl` seconds (default: the cache TTL)."""
+        try:
+            self.backend.set(self._key(key), encode(value), self.ttl if ttl is None else ttl)
+        except Exception as e:
+            logger.warning("Shared cache write failed: %s", e)
+
+    def get_or_compute(self, key, compute, ttl=None, wait=WAIT_SECONDS):
+        """
+        Cached value for `key`, computing and storing it on a miss.
+
+        Only the caller that takes the key's lock entry computes; others poll for its
+        result for up to `wait` seconds, then compute themselves. If the lock entry
+        disappears without a result (the owner's compute raised), a waiter takes the
+        lock over at once. Exceptions from `compute` propagate and nothing is cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock_key = self._key(f"lock:{key}")
+        owner = self._acquire(lock_key)
+
+        if not owner:
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                time.sleep(POLL_SECONDS)
+                value = self._read(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+                if not self._locked(lock_key):
+                    owner = self._acquire(lock_key)  # the owner gave up: compute now
+                    if owner:
+                        break
+
+        try:
+            value = compute()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            if owner:
+                self._delete(lock_key)
+
+    def stats(self):
+        """Hit/miss counters for this process."""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
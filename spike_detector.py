@@ -0,0 +1,226 @@
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from supabase_pool import create_pooled_client
+from table_loader import DEFAULT_PAGE_SIZE, iter_table_pages
+
+logger = logging.getLogger(__name__)
+
+# Incremental spike detection over the interest time series.
+# Each (keyword, geo) series keeps an exponentially weighted mean and variance in
+# flat NumPy arrays (about 20 bytes per series), so thousands of keywords fit in
+# memory and every new point is scored in O(1) without rescanning history. A point
+# is a spike when it sits `threshold` standard deviations above the running mean.
+
+SPIKE_TABLE = "brd_gtrends_spikes"
+STATE_PATH = os.getenv("SPIKE_STATE_PATH", os.path.join(".cache", "spike_state.npz"))
+SPIKE_ALPHA = float(os.getenv("SPIKE_ALPHA", 0.1))          # EWMA weight of the newest point
+SPIKE_THRESHOLD = float(os.getenv("SPIKE_THRESHOLD", 3.0))  # z-score that counts as a spike
+SPIKE_WARMUP = int(os.getenv("SPIKE_WARMUP", 12))           # points seen before a series can flag
+MIN_STD = 1.0   # interest points; stops near-flat series from flagging tiny bumps
+
+EVENT_COLUMNS = ["keyword", "geo", "time", "interest", "baseline", "zscore"]
+
+
+class SpikeDetector:
+    """
+    EWMA z-score detector with one compact state row per (keyword, geo) series.
+
+    update() accepts points in any order; each series consumes them in time order and
+    ignores anything not newer than the last point it has seen, so feeding overlapping
+    batches (e.g. repeated 90-day refreshes) is safe.
+    """
+
+    def __init__(self, alpha=SPIKE_ALPHA, threshold=SPIKE_THRESHOLD, warmup=SPIKE_WARMUP, capacity=1024):
+        self.alpha, self.threshold, self.warmup = alpha, threshold, warmup
+        self._slots = {}                                      # (keyword, geo) -> state row
+        self.mean = np.zeros(capacity, dtype=np.float32)
+        self.var = np.zeros(capacity, dtype=np.float32)
+        self.count = np.zeros(capacity, dtype=np.int32)
+        self.last_time = np.full(capacity, np.iinfo(np.int64).min, dtype=np.int64)
+        self.watermark = None                                 # highest multitimeline id scanned
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _grow(self, needed):
+        capacity = len(self.mean)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name, fill in (("mean", 0), ("var", 0), ("count", 0), ("last_time", np.iinfo(np.int64).min)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _slots_for(self, keys):
+        slots = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = len(self._slots)
+            slots[i] = slot
+        self._grow(len(self._slots))
+        return slots
+
+    def update(self, keywords, times, values, geos=None):
+        """
+        Feed new points and return the spikes among them as a DataFrame (EVENT_COLUMNS).
+
+        All series advance together: step s scores the s-th new point of every series
+        at once, so the Python loop runs once per point of the longest series in the
+        batch, not once per row.
+        """
+        keywords = np.asarray(keywords, dtype=object)
+        geos = np.full(len(keywords), "", dtype=object) if geos is None else np.asarray(geos, dtype=object)
+        when = pd.to_datetime(pd.Series(times), utc=True, errors="coerce", format="ISO8601")
+        values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64")
+
+        ok = when.notna().to_numpy() & ~np.isnan(values)
+        if not ok.any():
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        keywords, geos, values = keywords[ok], geos[ok], values[ok]
+        stamps = pd.DatetimeIndex(when[ok]).as_unit("ns").asi8
+
+        slots = self._slots_for(list(zip(keywords, geos)))
+        order = np.lexsort((stamps, slots))
+        slots, stamps, values, keywords, geos = slots[order], stamps[order], values[order], keywords[order], geos[order]
+        starts = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+        rank = np.arange(len(slots)) - np.repeat(starts, np.diff(np.r_[starts, len(slots)]))
+
+        events = []
+        by_step = np.argsort(rank, kind="stable")
+        step_bounds = np.searchsorted(rank[by_step], np.arange(rank.max() + 2))
+        for step in range(rank.max() + 1):
+            idx = by_step[step_bounds[step]:step_bounds[step + 1]]
+            idx = idx[stamps[idx] > self.last_time[slots[idx]]]
+            if not len(idx):
+                continue
+            s, x = slots[idx], values[idx]
+            mean, var, count = self.mean[s].astype("float64"), self.var[s].astype("float64"), self.count[s]
+
+            z = (x - mean) / np.maximum(np.sqrt(var), MIN_STD)
+            flagged = (count >= self.warmup) & (z >= self.threshold)
+            if flagged.any():
+                events.append(pd.DataFrame({
+                    "keyword": keywords[idx][flagged],
+                    "geo": geos[idx][flagged],
+                    "time": pd.to_datetime(stamps[idx][flagged], utc=True),
+                    "interest": x[flagged],
+                    "baseline": mean[flagged],
+                    "zscore": z[flagged],
+                }))
+
+            first = count == 0
+            diff = x - mean
+            increment = self.alpha * diff
+            self.mean[s] = np.where(first, x, mean + increment)
+            self.var[s] = np.where(first, 0.0, (1 - self.alpha) * (var + diff * increment))
+            self.count[s] = count + 1
+            self.last_time[s] = stamps[idx]
+
+        return pd.concat(events, ignore_index=True) if events else pd.DataFrame(columns=EVENT_COLUMNS)
+
+    def update_rows(self, rows):
+        """update() for a list of multitimeline row dicts (keyword, time, interest, optional geo)."""
+        if not rows:
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        return self.update(
+            [row["keyword"] for row in rows],
+            [row["time"] for row in rows],
+            [row["interest"] for row in rows],
+            [row.get("geo", "") for row in rows],
+        )
+
+    def save(self, path=STATE_PATH):
+        """Persist the state atomically as a .npz file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        n = len(self._slots)
+        keys = sorted(self._slots, key=self._slots.get)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            keywords=np.array([k for k, _ in keys], dtype=str),
+            geos=np.array([g for _, g in keys], dtype=str),
+            mean=self.mean[:n], var=self.var[:n], count=self.count[:n], last_time=self.last_time[:n],
+            watermark=np.array(-1 if self.watermark is None else self.watermark, dtype=np.int64),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH, **kwargs):
+        """Restore a saved detector, or start empty if there is no (readable) state file."""
+        try:
+            with np.load(path) as data:
+                detector = cls(capacity=max(len(data["mean"]), 1), **kwargs)
+                n = len(data["mean"])
+                detector._slots = {(k, g): i for i, (k, g) in enumerate(zip(data["keywords"].tolist(), data["geos"].tolist()))}
+                detector.mean[:n], detector.var[:n] = data["mean"], data["var"]
+                detector.count[:n], detector.last_time[:n] = data["count"], data["last_time"]
+                watermark = int(data["watermark"])
+                detector.watermark = None if watermark < 0 else watermark
+                return detector
+        except (OSError, KeyError, ValueError):
+            return cls(**kwargs)
+
+
+def event_rows(events):
+    """Spike events as JSON-ready dicts for the spikes table."""
+    if events.empty:
+        return []
+    rows = events.assign(time=events["time"].dt.strftime("%Y-%m-%dT%H:%M:%SZ"))
+    return rows[EVENT_COLUMNS].to_dict("records")
+
+
+def record_spikes(db, events, table=SPIKE_TABLE):
+    """Upsert spike events (unique on keyword, geo, time); return how many were written."""
+    rows = event_rows(events)
+    if rows:
+        db.table(table).upsert(rows, on_conflict="keyword,geo,time").execute()
+    return len(rows)
+
+
+def scan_table(db, detector, table="brd_gtrends_multitimeline", page_size=DEFAULT_PAGE_SIZE):
+    """
+    Feed multitimeline rows newer than the detector's id watermark, page by page.
+
+    Returns a DataFrame of the spikes found. Used for rows that land without going
+    through ingest_trends (which feeds the detector directly).
+    """
+    watermark = detector.watermark
+    filters = None if watermark is None else (lambda query: query.gt("id", watermark))
+
+    found = []
+    for page in iter_table_pages(db, table, ["id", "keyword", "time", "interest", "geo"], page_size, filters=filters):
+        found.append(detector.update(page["keyword"], page["time"], page["interest"], page["geo"].fillna("")))
+        detector.watermark = int(page["id"].max())
+    found = [events for events in found if not events.empty]
+    return pd.concat(found, ignore_index=True) if found else pd.DataFrame(columns=EVENT_COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan new multitimeline rows for spikes and record them.")
+    parser.add_argument("--state", default=STATE_PATH, help="Detector state file")
+    parser.add_argument("--dry-run", action="store_true", help="Report spikes without writing them or the state")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    load_dotenv()
+
+    db = create_pooled_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    detector = SpikeDetector.load(args.state)
+    events = scan_table(db, detector)
+    print(events.to_string(index=False) if not events.empty else "No new spikes.")
+    if not args.dry_run:
+        record_spikes(db, events)
+        detector.save(args.state)
+
+
+if __name__ == "__main__":
+    main()
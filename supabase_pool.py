@@ -0,0 +1,119 @@
+import os
+import threading
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestSession
+from storage3 import SyncStorageClient
+from storage3.utils import SyncClient as StorageSession
+from supabase import Client
+
+# Connection-pool limits for every Supabase HTTP session (override from the .env file)
+POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", 20))
+POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", 10))
+POOL_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", 60))
+
+
+class ConnectionStats:
+    """Process-wide counters: requests sent vs. new TCP connections opened."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self):
+        """Return the counters; `reused` is requests served on an already-open connection."""
+        with self._lock:
+            requests, new_connections = self.requests, self.new_connections
+        return {
+            "requests": requests,
+            "new_connections": new_connections,
+            "reused": max(requests - new_connections, 0),
+            "reuse_rate": (requests - new_connections) / requests if requests else 0.0,
+        }
+
+
+connection_stats = ConnectionStats()
+
+
+def _trace(event_name, info):
+    # httpcore trace hook: fires once per freshly opened TCP connection
+    if event_name == "connection.connect_tcp.complete":
+        connection_stats.record_new_connection()
+
+
+def _on_request(request):
+    connection_stats.record_request()
+    request.extensions["trace"] = _trace
+
+
+def _pooled_session_kwargs():
+    return {
+        "limits": httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+        ),
+        "event_hooks": {"request": [_on_request]},
+    }
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose session uses the shared pool limits and metrics hooks."""
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return PostgrestSession(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            follow_redirects=True,
+            http2=True,
+            **_pooled_session_kwargs(),
+        )
+
+
+class PooledStorageClient(SyncStorageClient):
+    """Storage client whose session uses the shared pool limits and metrics hooks."""
+
+    def _create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return StorageSession(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            proxy=proxy,
+            verify=bool(verify),
+            follow_redirects=True,
+            http2=True,
+            **_pooled_session_kwargs(),
+        )
+
+
+class PooledClient(Client):
+    """Supabase client whose REST and storage calls reuse keep-alive connections."""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=None, verify=True, proxy=None):
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        return PooledPostgrestClient(rest_url, headers=headers, schema=schema, verify=verify, proxy=proxy, **kwargs)
+
+    @staticmethod
+    def _init_storage_client(storage_url, headers, storage_client_timeout=None, verify=True, proxy=None):
+        if storage_client_timeout is None:
+            return PooledStorageClient(storage_url, headers, verify=verify, proxy=proxy)
+        return PooledStorageClient(storage_url, headers, storage_client_timeout, verify, proxy)
+
+
+def create_pooled_client(url, key):
+    """Create a Supabase client backed by pooled keep-alive HTTP sessions."""
+    return PooledClient.create(url, key)
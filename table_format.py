@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Shared table formatting for the "value + █ bar" columns shown on the Insights
+# and Competitor Analysis pages. Everything is vectorized: bar lengths are
+# computed with NumPy and mapped to strings through a small lookup table.
+
+BAR_CHAR = "█"
+SCALE_LENGTH = 20  # Controls bar length
+
+
+def bar_lengths(values, max_value, scale_length=SCALE_LENGTH):
+    """Bar length per value: round(min(v, max_value) / max_value * scale_length), never negative."""
+    values = np.asarray(values, dtype="float64")
+    if not max_value or max_value <= 0:
+        return np.zeros(len(values), dtype=np.int64)
+    scaled = np.minimum(values, max_value) / max_value * scale_length
+    # np.rint rounds half to even, exactly like Python's round()
+    return np.clip(np.rint(scaled), 0, scale_length).astype(np.int64)
+
+
+def bar_strings(values, max_value, scale_length=SCALE_LENGTH):
+    """Render the bars for `values` as strings via a lookup table (no per-row Python calls)."""
+    lookup = np.array([BAR_CHAR * n for n in range(scale_length + 1)], dtype=object)
+    return lookup[bar_lengths(values, max_value, scale_length)]
+
+
+def create_df_with_bar(df, query_col, value_col, label="Search Interest", max_for_bar=100, scale_length=SCALE_LENGTH):
+    """
+    Build a two-column display table ("Keyword", label) sorted by value, descending.
+
+    The label column reads "<value> <bar>", where the bar is scaled against `max_for_bar`.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame()
+
+    # Keep only necessary columns
+    new_df = df[[query_col, value_col]].copy()
+
+    # Convert to numeric and fill missing values
+    new_df[value_col] = pd.to_numeric(new_df[value_col], errors='coerce').fillna(0)
+
+    # **Sort in Descending Order**
+    new_df = new_df.sort_values(by=value_col, ascending=False)
+
+    values = new_df[value_col]
+    bars = pd.Series(bar_strings(values.to_numpy(), max_for_bar, scale_length), index=new_df.index)
+    new_df[label] = values.astype(str) + " " + bars
+
+    # Rename and keep only relevant columns (removes original numeric column)
+    return new_df.rename(columns={query_col: "Keyword"})[["Keyword", label]]
+
+
+def add_trend_bar(df, value_col, label="Search Interest", scale_length=SCALE_LENGTH):
+    """
+    Return a copy of `df` with a "<bar> <value>" column, bars scaled to the column's own maximum.
+    """
+    new_df = df.copy()
+    values = new_df[value_col]
+    bars = pd.Series(bar_strings(values.to_numpy(), values.max(), scale_length), index=new_df.index)
+    new_df[label] = bars + " " + values.astype(str)
+    return new_df
+
+
+def _create_df_with_bar_rowwise(df, query_col, value_col, label="Search Interest"):
+    """Original row-wise implementation, kept only as the benchmark baseline."""
+    new_df = df[[query_col, value_col]].copy()
+    new_df[value_col] = pd.to_numeric(new_df[value_col], errors='coerce').fillna(0)
+    new_df = new_df.sort_values(by=value_col, ascending=False)
+
+    def get_bar(v):
+        clamped = min(v, 100)
+        bar_len = int(round((clamped / 100) * SCALE_LENGTH))
+        return BAR_CHAR * bar_len
+
+    new_df[label] = new_df.apply(lambda row: f"{row[value_col]} {get_bar(row[value_col])}", axis=1)
+    return new_df.rename(columns={query_col: "Keyword"})[["Keyword", label]]
+
+
+def benchmark(sizes=(1_000, 10_000, 100_000, 1_000_000), repeats=3):
+    """Time the row-wise and vectorized builders on synthetic data and check they agree."""
+    import time
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'row-wise (s)':>14} {'vectorized (s)':>15} {'speed-up':>9}")
+    for n in sizes:
+        df = pd.DataFrame({
+            "relatedquery": rng.choice(["knotless braids", "boho braids", "box braids", "goddess locs"], n),
+            "interest": rng.integers(0, 120, n),
+        })
+
+        def best_of(fn):
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                result = fn(df, "relatedquery", "interest")
+                best = min(best, time.perf_counter() - start)
+            return best, result
+
+        rowwise_time, expected = best_of(_create_df_with_bar_rowwise)
+        vector_time, actual = best_of(create_df_with_bar)
+        assert actual.equals(expected), "vectorized output differs from the row-wise baseline"
+        print(f"{n:>10,} {rowwise_time:>14.4f} {vector_time:>15.4f} {rowwise_time / vector_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark()
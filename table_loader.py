@@ -0,0 +1,121 @@
+import os
+import re
+
+import pandas as pd
+
+# Rows per PostgREST request; keep it at or below the API's max-rows setting
+DEFAULT_PAGE_SIZE = int(os.getenv("SUPABASE_PAGE_SIZE", 1000))
+
+
+def select_clause(columns=None):
+    """Build a PostgREST select list, quoting names such as "region/state"."""
+    if not columns:
+        return "*"
+    return ",".join(
+        col if re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", col) else f'"{col}"'
+        for col in columns
+    )
+
+
+def iter_table_pages(client, table_name, columns=None, page_size=DEFAULT_PAGE_SIZE, order_by="id", filters=None):
+    """
+    Stream a Supabase table as DataFrame pages using server-side `.range()` pagination.
+
+    Parameters:
+    - client: A Supabase client.
+    - table_name: Table to read.
+    - columns: Only these columns are selected (None selects all).
+    - page_size: Rows per request; only one page is held in memory at a time.
+    - order_by: Column (or tuple of columns) giving a stable order across pages.
+    - filters: Optional callable that adds predicates to the query builder.
+
+    Yields:
+    - One DataFrame per page.
+    """
+    start = 0
+    while True:
+        query = client.table(table_name).select(select_clause(columns))
+        if filters is not None:
+            query = filters(query)
+        for column in (order_by,) if isinstance(order_by, str) else order_by or ():
+            query = query.order(column)
+        rows = query.range(start, start + page_size - 1).execute().data
+        if not rows:
+            return
+
+        yield pd.DataFrame(rows, columns=columns)
+        # Advance by what actually came back: the server may cap a page below page_size
+        start += len(rows)
+
+
+def keyset_filter(keys, values):
+    """
+    PostgREST filter for rows strictly after `values` in (keys[0], keys[1]) order,
+    e.g. after (updated_at, id) = ("2025-01-01T00:00:00+00:00", 42).
+    """
+    (first, second), (first_value, second_value) = keys, values
+    return lambda query: query.or_(
+        f'{first}.gt."{first_value}",and({first}.eq."{first_value}",{second}.gt."{second_value}")'
+    )
+
+
+def iter_keyset_pages(client, table_name, columns, keys, after=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Stream a table in (keys[0], keys[1]) order, each page starting after the last row of the previous one.
+
+    Unlike `.range()` offsets, a row whose sort key moves while the table is being read
+    (an upsert bumping updated_at) cannot shift unread rows out of the window: it is
+    simply read again at its new position.
+
+    Parameters:
+    - keys: Two columns, the second unique (e.g. ("updated_at", "id")); both must be in `columns`.
+    - after: Optional starting (keys[0], keys[1]) values; None starts at the beginning.
+
+    Yields:
+    - One DataFrame per page.
+    """
+    while True:
+        query = client.table(table_name).select(select_clause(columns))
+        if after is not None:
+            query = keyset_filter(keys, after)(query)
+        for column in keys:
+            query = query.order(column)
+        rows = query.limit(page_size).execute().data
+        if not rows:
+            return
+
+        yield pd.DataFrame(rows, columns=columns)
+        after = (rows[-1][keys[0]], rows[-1][keys[1]])
+
+
+def load_table(client, table_name, columns=None, page_size=DEFAULT_PAGE_SIZE, order_by="id", filters=None):
+    """Load a whole table page by page and return it as one DataFrame."""
+    pages = list(iter_table_pages(client, table_name, columns, page_size, order_by, filters))
+    if not pages:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(pages, ignore_index=True)
+
+
+def table_version(client, table_name, updated_column=None, id_column="id"):
+    """
+    Cheap fingerprint of a Supabase table: (planned row count, highest id, latest updated value).
+
+    Costs one or two single-row index lookups, so it can be checked far more often than
+    the table can be reloaded. The count is the planner's estimate (no count(*) scan):
+    inserts move the highest id and updates the latest updated value, while the estimate
+    picks up deletes once the table has been analyzed.
+    """
+    head = (
+        client.table(table_name).select(select_clause([id_column]), count="planned")
+        .order(id_column, desc=True).limit(1).execute()
+    )
+    top_id = head.data[0][id_column] if head.data else None
+    latest = None
+    if updated_column:
+        rows = (
+            client.table(table_name).select(select_clause([updated_column]))
+            .not_.is_(updated_column, "null")  # descending order puts NULLs first in PostgREST
+            .order(updated_column, desc=True).limit(1).execute().data
+        )
+        latest = rows[0][updated_column] if rows else None
+    return (head.count, top_id, latest)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from trends_client import split_keywords
+
+# Google Trends compares at most five terms per request and scales each response
+# so that its own peak is 100. To put hundreds of terms on one scale, every
+# request shares an "anchor" term; each group is rescaled so its anchor matches
+# the anchor in the reference group, then the whole set is rescaled to 0-100.
+MAX_TERMS_PER_REQUEST = 5
+
+
+def chunk_keywords(keywords, anchor=None, max_terms=MAX_TERMS_PER_REQUEST):
+    """
+    Split keywords into groups of at most `max_terms` that all contain the anchor.
+
+    The anchor defaults to the first keyword. Pick a steadily popular term: an anchor
+    that rounds to 0 in a group makes that group impossible to rescale.
+    """
+    keywords = list(dict.fromkeys(split_keywords(keywords)))  # de-duplicate, keep order
+    if not keywords:
+        return []
+    anchor = anchor.strip() if anchor else keywords[0]
+    others = [keyword for keyword in keywords if keyword != anchor]
+    size = max_terms - 1
+    return [[anchor] + others[i:i + size] for i in range(0, len(others), size)] or [[anchor]]
+
+
+def rescale_to_anchor(frames, anchor):
+    """
+    Put per-request frames on one 0-100 scale using the shared anchor column.
+
+    Each frame is multiplied by (reference anchor mean / its anchor mean). The first
+    frame is the reference. Groups whose anchor is all zero cannot be compared and
+    come back as NaN.
+    """
+    reference = frames[0][anchor].mean()
+    scaled = [frames[0]]
+    for frame in frames[1:]:
+        anchor_level = frame[anchor].mean()
+        factor = reference / anchor_level if anchor_level > 0 else np.nan
+        scaled.append(frame.drop(columns=anchor) * factor)
+
+    combined = pd.concat(scaled, axis=1)
+    peak = np.nanmax(combined.to_numpy()) if combined.size else 0
+    return combined * (100.0 / peak) if peak > 0 else combined
+
+
+def fetch_comparable(client, keywords, start_time, end_time, geo="", anchor=None, max_workers=None):
+    """
+    Fetch any number of keywords as one comparable dataset.
+
+    Parameters:
+    - client: A TrendsClient.
+    - keywords: Comma-separated string or list of terms (no limit on how many).
+    - anchor: Term included in every request (defaults to the first keyword).
+    - max_workers: Concurrency for the group requests.
+
+    Returns:
+    - (frame, errors): a time x keyword DataFrame on a common 0-100 scale, and a dict of
+      group index -> error message for groups that could not be fetched.
+    """
+    chunks = chunk_keywords(keywords, anchor)
+    if not chunks:
+        return pd.DataFrame(), {}
+    anchor = chunks[0][0]
+
+    results = client.fetch_many([(chunk, start_time, end_time, geo) for chunk in chunks], max_workers=max_workers)
+
+    frames, errors = [], {}
+    for idx, result in enumerate(results):
+        if isinstance(result, dict):
+            errors[idx] = result["error"]
+            continue
+        frames.append(result)
+
+    if not frames:
+        return pd.DataFrame(), errors
+    return rescale_to_anchor(frames, anchor), errors
+
+
+def to_long(frame):
+    """Reshape a time x keyword frame into (time, keyword, interest) rows."""
+    long_df = frame.rename_axis("time").reset_index().melt(id_vars="time", var_name="keyword", value_name="interest")
+    return long_df.dropna(subset=["interest"])
@@ -0,0 +1,254 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limiter import trends_rate_limiter
+
+# Google Trends widget endpoint; override TRENDS_BASE_URL to point at a local stub server
+TRENDS_BASE_URL = os.getenv("TRENDS_BASE_URL", "https://trends.google.com")
+MULTILINE_PATH = "/trends/api/widgetdata/multiline"
+COMPAREDGEO_PATH = "/trends/api/widgetdata/comparedgeo"
+RELATED_PATH = "/trends/api/widgetdata/relatedsearches"
+DEFAULT_TOKEN = "APP6_UEAAAAAZ6Hj7x8eBzGqYkg6FHp6gSFeZVkcC-73"
+
+DEFAULT_HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "en-US,en;q=0.9",
+    "cache-control": "no-cache",
+    "pragma": "no-cache",
+    "referer": "https://trends.google.com/trends/explore?cat=146&date=now%201-d&q=braids&hl=en-GB",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin",
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+}
+
+CONNECT_TIMEOUT = 5   # seconds to open the connection
+READ_TIMEOUT = 30     # seconds to wait for the response
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Resolutions Google accepts, finest first, with the seconds each point covers
+RESOLUTIONS = (
+    ("MINUTE", 60),
+    ("EIGHT_MINUTE", 8 * 60),
+    ("SIXTEEN_MINUTE", 16 * 60),
+    ("HOUR", 60 * 60),
+    ("DAY", 24 * 60 * 60),
+    ("WEEK", 7 * 24 * 60 * 60),
+    ("MONTH", 30 * 24 * 60 * 60),
+)
+TARGET_POINTS = 200        # aim for at least this many points per series
+DEFAULT_RESOLUTION = "EIGHT_MINUTE"
+
+XSSI_PREFIX = ")]}'"       # Google prepends this to JSON responses to block script inclusion
+
+
+def split_keywords(keywords):
+    """Accept "a, b, c" or ["a", "b", "c"] and return a clean list of terms."""
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    return [keyword.strip() for keyword in keywords if keyword.strip()]
+
+
+def choose_resolution(start_time, end_time, target_points=TARGET_POINTS):
+    """
+    Coarsest resolution that still yields at least `target_points` points over the span.
+
+    Falls back to DEFAULT_RESOLUTION when the times cannot be parsed (e.g. "now 1-d").
+    """
+    try:
+        start = pd.Timestamp(str(start_time).replace("\\", ""))
+        end = pd.Timestamp(str(end_time).replace("\\", ""))
+    except ValueError:
+        return DEFAULT_RESOLUTION
+
+    span = (end - start).total_seconds()
+    for name, seconds in reversed(RESOLUTIONS):
+        if span / seconds >= target_points:
+            return name
+    return RESOLUTIONS[0][0]
+
+
+def decode_payload(text):
+    """Strip the anti-XSSI prefix from a Trends response and decode the JSON."""
+    if text.startswith(XSSI_PREFIX):
+        text = text[text.find("\n") + 1:] if "\n" in text else text[len(XSSI_PREFIX):]
+    return json.loads(text)
+
+
+def parse_multiline(payload, keywords):
+    """
+    Parse a multiline (interest over time) response into a compact time series frame.
+
+    Returns a DataFrame indexed by UTC time with one float32 column per keyword;
+    points Google flags as having no data are NaN.
+    """
+    if isinstance(payload, str):
+        payload = decode_payload(payload)
+    keywords = split_keywords(keywords)
+    rows = payload.get("default", {}).get("timelineData", [])
+
+    times = np.fromiter((int(row["time"]) for row in rows), dtype=np.int64, count=len(rows))
+    values = np.array([row["value"] for row in rows], dtype=np.float32).reshape(len(rows), len(keywords))
+    has_data = np.array([row.get("hasData", [True] * len(keywords)) for row in rows], dtype=bool).reshape(values.shape)
+    values[~has_data] = np.nan
+
+    index = pd.DatetimeIndex(pd.to_datetime(times, unit="s", utc=True), name="time")
+    return pd.DataFrame(values, index=index, columns=keywords)
+
+
+class RateLimitedRetry(Retry):
+    """urllib3 Retry that also takes a rate-limiter token before every retry attempt."""
+
+    rate_limiter = None
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.rate_limiter = self.rate_limiter
+        return retry
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+
+class TrendsClient:
+    """
+    Google Trends fetcher with a persistent HTTP pool, timeouts and retries.
+
+    - One requests.Session keeps TLS connections alive across calls.
+    - Every request has a connect and a read timeout, so a stalled call cannot hang the page.
+    - 429/5xx responses and connection errors are retried with exponential backoff plus
+      random jitter, honouring Retry-After when Google sends it.
+    - Every request and every retry first takes a token from the process-wide rate limiter.
+    """
+
+    def __init__(self, base_url=TRENDS_BASE_URL, token=DEFAULT_TOKEN, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 max_retries=4, backoff_factor=1.0, backoff_jitter=1.0, pool_size=16, rate_limiter=trends_rate_limiter):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+
+        retry = RateLimitedRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        retry.rate_limiter = rate_limiter
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _params(self, req):
+        return {"hl": "en-GB", "tz": "-120", "req": json.dumps(req), "token": self.token}
+
+    @staticmethod
+    def _keyword_restriction(keywords):
+        return {"keyword": [{"type": "BROAD", "value": keyword} for keyword in split_keywords(keywords)]}
+
+    def build_params(self, keywords, start_time, end_time, geo="", resolution=None):
+        """Query parameters for one multiline (interest over time) comparison."""
+        req = {
+            "time": f"{start_time} {end_time}",
+            "resolution": resolution or choose_resolution(start_time, end_time),
+            "locale": "en-GB",
+            "comparisonItem": [
+                {
+                    "geo": {"country": geo} if geo else {},
+                    "complexKeywordsRestriction": self._keyword_restriction(keywords),
+                }
+            ],
+            "requestOptions": {"property": "", "backend": "CM", "category": 146},
+            "userConfig": {"userType": "USER_TYPE_LEGIT_USER"},
+        }
+        return self._params(req)
+
+    def get(self, path, params):
+        """GET a Trends API path and return the decoded JSON payload."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+        response.raise_for_status()  # Raise an exception for HTTP errors
+        return decode_payload(response.text)
+
+    def fetch(self, keywords, start_time, end_time, geo="", resolution=None):
+        """
+        Fetch one comparison as a time x keyword frame (see parse_multiline).
+
+        The resolution is picked from the time span unless given explicitly.
+        Raises requests.RequestException once retries are exhausted.
+        """
+        payload = self.get(MULTILINE_PATH, self.build_params(keywords, start_time, end_time, geo, resolution))
+        return parse_multiline(payload, keywords)
+
+    def fetch_geo(self, keyword, start_time, end_time, geo=""):
+        """Decoded interest-by-region payload: countries worldwide, or sub-regions of `geo`."""
+        req = {
+            "geo": {"country": geo} if geo else {},
+            "comparisonItem": [
+                {"time": f"{start_time} {end_time}", "complexKeywordsRestriction": self._keyword_restriction(keyword)}
+            ],
+            "resolution": "REGION" if geo else "COUNTRY",
+            "locale": "en-GB",
+            "requestOptions": {"property": "", "backend": "CM", "category": 146},
+            "dataMode": "PERCENTAGES",
+        }
+        return self.get(COMPAREDGEO_PATH, self._params(req))
+
+    def fetch_related(self, keyword, start_time, end_time, geo="", keyword_type="QUERY"):
+        """Decoded related searches payload (TOP and RISING lists); keyword_type is QUERY or ENTITY."""
+        req = {
+            "restriction": {
+                "geo": {"country": geo} if geo else {},
+                "time": f"{start_time} {end_time}",
+                "originalTimeRangeForExploreUrl": f"{start_time} {end_time}",
+                "complexKeywordsRestriction": self._keyword_restriction(keyword),
+            },
+            "keywordType": keyword_type,
+            "metric": ["TOP", "RISING"],
+            "requestOptions": {"property": "", "backend": "CM", "category": 146},
+            "language": "en",
+        }
+        return self.get(RELATED_PATH, self._params(req))
+
+    def fetch_many(self, jobs, max_workers=None):
+        """
+        Fetch many (keywords, start_time, end_time, geo) combinations in parallel.
+
+        Returns a list aligned with `jobs`; a failed job yields {"error": "..."} instead
+        of raising, so one bad combination does not sink the whole batch.
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return []
+
+        def run(job):
+            try:
+                return self.fetch(*job)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                return {"error": str(e)}
+            except (KeyError, IndexError, TypeError, AttributeError) as e:
+                # Valid JSON with an unexpected shape: report it for this job only
+                return {"error": f"Malformed response: {type(e).__name__}: {e}"}
+
+        with ThreadPoolExecutor(max_workers=min(max_workers or self.pool_size, len(jobs))) as pool:
+            return list(pool.map(run, jobs))
+
+    def close(self):
+        self.session.close()
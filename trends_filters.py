@@ -0,0 +1,126 @@
+import pandas as pd
+
+# Region and timeframe filters of the Insights page, translated into predicates
+# that are pushed down to the Parquet mirror (pyarrow row-group filtering), so a
+# filtered view never materialises the rows it excludes.
+# A region spanning several countries is averaged per keyword and time (see
+# combine_geos), so the charts always get one series per keyword.
+
+# Region option -> Google geo codes ingest_trends.py stores ("" = a worldwide run)
+REGION_GEOS = {
+    "Worldwide": ("",),
+    "US": ("US",),
+    "Africa": (
+        "DZ", "AO", "BJ", "BW", "BF", "BI", "CM", "CV", "CF", "TD", "KM", "CD", "CG", "CI", "DJ", "EG",
+        "GQ", "ER", "SZ", "ET", "GA", "GM", "GH", "GN", "GW", "KE", "LS", "LR", "LY", "MG", "MW", "ML",
+        "MR", "MU", "MA", "MZ", "NA", "NE", "NG", "RW", "ST", "SN", "SC", "SL", "SO", "ZA", "SS", "SD",
+        "TZ", "TG", "TN", "UG", "ZM", "ZW",
+    ),
+    "Middle East": ("AE", "BH", "EG", "IL", "IQ", "IR", "JO", "KW", "LB", "OM", "PS", "QA", "SA", "SY", "TR", "YE"),
+    "Southern Africa": ("ZA", "NA", "BW", "ZW", "ZM", "MZ", "LS", "SZ", "AO", "MW"),
+}
+
+# Region option -> plotly choropleth locationmode for its geomap rows: worldwide runs store
+# country names, US runs state codes; other regions' sub-region codes have no plotly outline
+MAP_LOCATION_MODES = {"Worldwide": "country names", "US": "USA-states"}
+
+# Timeframe option -> how far back from now
+TIMEFRAMES = {
+    "Past hour": pd.Timedelta(hours=1),
+    "Past 4 hours": pd.Timedelta(hours=4),
+    "Past day": pd.Timedelta(days=1),
+    "Past 7 days": pd.Timedelta(days=7),
+    "Past 30 days": pd.Timedelta(days=30),
+    "Past 90 days": pd.Timedelta(days=90),
+    "Past 12 months": pd.Timedelta(days=365),
+    "Past 5 years": pd.Timedelta(days=5 * 365),
+}
+
+# Tables with a time dimension and the ISO date column the window is pushed down on
+TIME_COLUMNS = {"brd_gtrends_multitimeline": "date"}
+
+# Columns identifying one data point once the geo is set aside (per-country rows sharing them are averaged)
+POINT_KEYS = {
+    "brd_gtrends_geomap": ["keyword", "region/state"],
+    "brd_gtrends_multitimeline": ["keyword", "time"],
+    "brd_gtrends_relatedqueries": ["keyword", "category", "relatedquery"],
+    "brd_gtrends_relatedentities": ["keyword", "category", "relatedtopic"],
+}
+MEAN_COLUMNS = ("interest", "searchfreqinc")  # averaged, then rounded back to whole numbers
+LATEST_COLUMNS = ("id", "updated_at")  # kept as the max, so frame_version still moves
+PLACE_COLUMNS = ("geo", "country")      # set to the region name on combined rows
+
+
+def window_start(timeframe, now=None):
+    """UTC start of the timeframe window (None for an unknown option)."""
+    delta = TIMEFRAMES.get(timeframe)
+    if delta is None:
+        return None
+    now = pd.Timestamp.now(tz="UTC") if now is None else pd.Timestamp(now)
+    return now - delta
+
+
+def mirror_filters(table_name, region="Worldwide", timeframe=None, now=None):
+    """
+    pyarrow filter list for read_table, or None when nothing is filtered.
+
+    The date predicate works at day granularity on the ISO date column (ISO strings
+    sort like dates); refine_time_window applies the exact cutoff afterwards.
+    """
+    predicates = []
+    geos = REGION_GEOS.get(region)
+    if geos is not None:
+        predicates.append(("geo", "in", list(geos)))
+
+    date_col = TIME_COLUMNS.get(table_name)
+    start = window_start(timeframe, now)
+    if date_col and start is not None:
+        predicates.append((date_col, ">=", start.strftime("%Y-%m-%d")))
+    return predicates or None
+
+
+def combine_geos(df, table_name, region):
+    """
+    Average a multi-country region into one row per data point (e.g. per keyword and
+    time), so per-country series are never interleaved in one frame.
+
+    Single-geo regions and tables without POINT_KEYS are returned unchanged; the geo
+    (and country) column of the combined rows holds the region name.
+    """
+    keys = POINT_KEYS.get(table_name)
+    if keys is None or len(REGION_GEOS.get(region) or ()) <= 1 or df.empty:
+        return df
+    if not set(keys).issubset(df.columns):
+        return df
+
+    agg = {}
+    for col in df.columns:
+        if col in keys or col in PLACE_COLUMNS:
+            continue
+        agg[col] = "mean" if col in MEAN_COLUMNS else "max" if col in LATEST_COLUMNS else "first"
+    combined = df.groupby(keys, as_index=False, observed=True, sort=True).agg(agg)
+    for col in MEAN_COLUMNS:
+        if col in combined.columns:
+            combined[col] = combined[col].round().astype("Int64")
+    for col in PLACE_COLUMNS:
+        if col in df.columns:
+            combined[col] = pd.Series(region, index=combined.index, dtype="category")
+    return combined[[col for col in df.columns if col in combined.columns]]
+
+
+def for_keyword(df, keyword):
+    """Rows of one keyword (geomap and related tables hold one set of rows per ingested keyword)."""
+    if "keyword" not in df.columns:
+        return df
+    return df[df["keyword"] == keyword].reset_index(drop=True)
+
+
+def refine_time_window(df, table_name, timeframe, now=None, time_col="time"):
+    """Apply the exact window on the parsed time column after the day-granular pushed-down read."""
+    start = window_start(timeframe, now)
+    if table_name not in TIME_COLUMNS or start is None:
+        return df
+    if df.empty or time_col not in df.columns:
+        return df
+    times = pd.to_datetime(df[time_col], utc=True, errors="coerce", format="ISO8601")
+    return df[times >= start]
@@ -0,0 +1,238 @@
+import glob
+import json
+import os
+import shutil
+import threading
+
+import pandas as pd
+import pyarrow.parquet as pq
+from filelock import FileLock
+
+from table_loader import DEFAULT_PAGE_SIZE, iter_keyset_pages
+
+# Local columnar mirror of the Supabase Google Trends tables.
+# Each table lives in its own folder of Parquet part files plus a small JSON
+# state file holding the watermark: the (updated_at, id) of the last row mirrored.
+# ingest_trends.py upserts in place, so a refreshed row keeps its id but gets a new
+# updated_at (trigger in migrations/004_trends_updated_at.sql) and lands in a later
+# part; reads and compaction keep only the newest copy of each id.
+# Syncs take a per-table file lock, so several Streamlit processes on one host can
+# share the mirror; a full rebuild is written next to the live folder and only
+# swapped in once every page has been fetched. Removing parts (compaction) and
+# swapping folders happen under a second, short-lived "files" lock that read_table
+# also takes, so a reader never sees a half-replaced table.
+MIRROR_DIR = os.getenv("TRENDS_MIRROR_DIR", os.path.join(".cache", "trends_mirror"))
+
+WATERMARK_COLUMN = "updated_at"  # set on insert and on every update; ties are broken by id
+ID_COLUMN = "id"
+# Each sync re-reads this far behind the watermark: updated_at is the transaction's
+# start time, so a slow transaction can commit rows older than ones already mirrored
+SYNC_OVERLAP = pd.Timedelta(seconds=int(os.getenv("TRENDS_SYNC_OVERLAP", 300)))
+
+# Only the columns the Insights charts and filters use are mirrored (plus id and the watermark)
+TRENDS_COLUMNS = {
+    "brd_gtrends_geomap": ["id", "keyword", "region/state", "interest", "geo", "updated_at"],
+    "brd_gtrends_multitimeline": ["id", "keyword", "time", "date", "interest", "geo", "updated_at"],
+    "brd_gtrends_relatedqueries": ["id", "keyword", "category", "relatedquery", "interest", "searchfreqinc", "country", "geo", "updated_at"],
+    "brd_gtrends_relatedentities": ["id", "keyword", "category", "relatedtopic", "interest", "searchfreqinc", "country", "geo", "updated_at"],
+}
+TRENDS_TABLES = tuple(TRENDS_COLUMNS)
+
+MAX_PARTS = 32           # compact the part files once a table has more than this
+
+_table_locks = {table: threading.Lock() for table in TRENDS_TABLES}
+
+
+def _table_dir(table_name):
+    return os.path.join(MIRROR_DIR, table_name)
+
+
+def _lock_path(table_name):
+    return os.path.join(MIRROR_DIR, f"{table_name}.lock")  # outside the folder that gets swapped
+
+
+def _files_lock(table_name):
+    """Short-lived lock around part removal / folder swaps and reads (not held during fetches)."""
+    return FileLock(os.path.join(MIRROR_DIR, f"{table_name}.files.lock"))
+
+
+def _state_path(table_name, directory=None):
+    return os.path.join(directory or _table_dir(table_name), "_state.json")
+
+
+def _part_files(table_name, directory=None):
+    return sorted(glob.glob(os.path.join(directory or _table_dir(table_name), "part-*.parquet")))
+
+
+def load_state(table_name):
+    """Return the mirror state for a table: {"watermark": ..., "rows": ...}."""
+    try:
+        with open(_state_path(table_name), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"watermark": None, "rows": 0, "columns": None}
+
+
+def _save_state(table_name, state, directory=None):
+    path = _state_path(table_name, directory)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _write_part(table_name, df, directory=None):
+    parts = _part_files(table_name, directory)
+    next_idx = int(os.path.basename(parts[-1])[5:-8]) + 1 if parts else 0
+    path = os.path.join(directory or _table_dir(table_name), f"part-{next_idx:08d}.parquet")
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+
+def compact_table(table_name):
+    """
+    Merge all part files of a table into a single Parquet file.
+
+    The merged file gets the next part index, so until the old parts are removed a
+    reader sees it last and keeps its (identical) rows; removal holds the files lock.
+    """
+    parts = _part_files(table_name)
+    if len(parts) <= 1:
+        return
+    df = _latest_rows(pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True))
+    _write_part(table_name, df)
+    with _files_lock(table_name):
+        for p in parts:
+            os.remove(p)
+
+
+def reset_table(table_name):
+    """Delete a table's mirror so the next sync starts from scratch."""
+    with FileLock(_lock_path(table_name)), _files_lock(table_name):
+        shutil.rmtree(_table_dir(table_name), ignore_errors=True)
+
+
+def _fetch_into(client, table_name, state, directory, watermark_column, page_size):
+    """
+    Append rows changed since state["watermark"] to `directory`; returns how many were fetched.
+
+    Reading starts SYNC_OVERLAP before the watermark. The (id, updated_at) keys read inside
+    that window are kept in state["recent"], so only rows not mirrored yet are written.
+    """
+    watermark = state["watermark"]
+    recent = {tuple(key) for key in state.get("recent", [])}
+    after = None
+    if watermark is not None:
+        after = ((pd.Timestamp(watermark[0]) - SYNC_OVERLAP).isoformat(), 0)
+
+    new_rows = 0
+    for page in iter_keyset_pages(client, table_name, state["columns"], (watermark_column, ID_COLUMN), after, page_size):
+        keys = list(zip(page[ID_COLUMN].astype(int), page[watermark_column].astype(str)))
+        fresh = page[[key not in recent for key in keys]]
+        if not fresh.empty:
+            _write_part(table_name, fresh, directory)
+            state["rows"] += len(fresh)
+            new_rows += len(fresh)
+
+        last = [keys[-1][1], keys[-1][0]]  # plain JSON-serializable values
+        if watermark is None or pd.Timestamp(last[0]) > pd.Timestamp(watermark[0]):
+            watermark = last
+        window_start = pd.Timestamp(watermark[0]) - SYNC_OVERLAP
+        recent = {key for key in recent.union(keys) if pd.Timestamp(key[1]) >= window_start}
+        state["watermark"], state["recent"] = watermark, sorted(recent)
+        _save_state(table_name, state, directory)  # persist after every page so a crash resumes here
+    return new_rows
+
+
+def _swap_in(table_name, directory):
+    """Replace the live table folder with `directory`; readers wait on the files lock meanwhile."""
+    live = _table_dir(table_name)
+    retired = live + ".old"
+    shutil.rmtree(retired, ignore_errors=True)
+    with _files_lock(table_name):
+        if os.path.exists(live):
+            os.replace(live, retired)
+        os.replace(directory, live)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def sync_table(client, table_name, watermark_column=WATERMARK_COLUMN, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Pull rows inserted or updated since the stored watermark into the local mirror.
+
+    Parameters:
+    - client: A Supabase client.
+    - table_name: Supabase table to mirror.
+    - watermark_column: Timestamp column bumped on every insert and update.
+    - page_size: Rows fetched per request.
+
+    Returns:
+    - The updated mirror state, with "new_rows" for this run.
+
+    When the projected columns changed, the table is re-fetched into a side folder
+    that replaces the live mirror only after the fetch succeeded; if it fails, the
+    old mirror keeps being served.
+    """
+    os.makedirs(MIRROR_DIR, exist_ok=True)
+    lock = _table_locks.setdefault(table_name, threading.Lock())
+
+    columns = TRENDS_COLUMNS.get(table_name)
+    with lock, FileLock(_lock_path(table_name)):
+        state = load_state(table_name)
+        if state.get("columns") != columns:
+            # The projected column set changed: rebuild the mirror beside the live one
+            rebuild_dir = _table_dir(table_name) + ".rebuild"
+            shutil.rmtree(rebuild_dir, ignore_errors=True)
+            os.makedirs(rebuild_dir)
+            state = {"watermark": None, "rows": 0, "columns": columns}
+            try:
+                new_rows = _fetch_into(client, table_name, state, rebuild_dir, watermark_column, page_size)
+                _save_state(table_name, state, rebuild_dir)
+            except BaseException:
+                shutil.rmtree(rebuild_dir, ignore_errors=True)
+                raise
+            _swap_in(table_name, rebuild_dir)
+        else:
+            os.makedirs(_table_dir(table_name), exist_ok=True)
+            new_rows = _fetch_into(client, table_name, state, None, watermark_column, page_size)
+
+        if len(_part_files(table_name)) > MAX_PARTS:
+            compact_table(table_name)
+
+    return {**state, "new_rows": new_rows}
+
+
+def _read_part(path, columns=None, filters=None):
+    if filters:
+        names = set(pq.read_schema(path).names)
+        filters = [f for f in filters if f[0] in names] or None  # skip predicates on columns this part lacks
+    return pd.read_parquet(path, columns=columns, filters=filters)
+
+
+def read_table(table_name, columns=None, filters=None):
+    """
+    Read a mirrored table into a DataFrame.
+
+    Parameters:
+    - columns: Only read these columns.
+    - filters: pyarrow predicates such as [("geo", "in", ["US"]), ("date", ">=", "2025-01-01")],
+      evaluated while reading so excluded rows are never materialised.
+    """
+    os.makedirs(MIRROR_DIR, exist_ok=True)
+    with _files_lock(table_name):  # no compaction or swap can remove parts mid-read
+        parts = _part_files(table_name)
+        if not parts:
+            return pd.DataFrame(columns=columns or TRENDS_COLUMNS.get(table_name))
+        if len(parts) == 1:
+            return _read_part(parts[0], columns, filters)  # a single part never repeats an id
+
+        read_columns = columns if columns is None or ID_COLUMN in columns else [*columns, ID_COLUMN]
+        frames = [_read_part(p, read_columns, filters) for p in parts]
+    df = _latest_rows(pd.concat(frames, ignore_index=True))
+    return df if read_columns is columns else df[columns]
+
+
+def _latest_rows(df):
+    """Keep the last copy of every id: parts are written in watermark order, so it is the newest."""
+    if ID_COLUMN not in df.columns:
+        return df
+    return df.drop_duplicates(ID_COLUMN, keep="last").reset_index(drop=True)
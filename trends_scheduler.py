@@ -0,0 +1,219 @@
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from dotenv import load_dotenv
+
+from ingest_trends import INGEST_TARGETS, ingest
+from spike_detector import SpikeDetector
+from supabase_pool import create_pooled_client
+from trends_client import TrendsClient, split_keywords
+
+logger = logging.getLogger(__name__)
+
+# Background refresh of the tracked Google Trends keywords.
+# A ticker enqueues one job per (keyword group, geo) every interval; a single
+# worker thread drains the queue through ingest_trends.ingest, so the rate-limited
+# TrendsClient is the only thing talking to Google. Pages only read the refreshed
+# tables (through the mirror) and never fetch inline.
+SCHEDULER_ENABLED = os.getenv("TRENDS_SCHEDULER_ENABLED", "").lower() in ("1", "true", "yes")
+REFRESH_INTERVAL = float(os.getenv("TRENDS_REFRESH_INTERVAL", 6 * 60 * 60))  # seconds
+LOOKBACK_DAYS = int(os.getenv("TRENDS_REFRESH_LOOKBACK_DAYS", 90))
+TRACKED_KEYWORDS = os.getenv("TRENDS_TRACKED_KEYWORDS", "")
+TRACKED_GEOS = os.getenv("TRENDS_TRACKED_GEOS", "")      # comma-separated; empty means worldwide
+KEYWORDS_PER_JOB = int(os.getenv("TRENDS_KEYWORDS_PER_JOB", 20))
+
+
+class RefreshJob(NamedTuple):
+    """One unit of refresh work; identical jobs compare equal, which is what dedup relies on."""
+    keywords: tuple
+    geo: str
+    start_time: str
+    end_time: str
+    datasets: tuple = tuple(INGEST_TARGETS)
+
+
+def tracked_jobs(keywords=TRACKED_KEYWORDS, geos=TRACKED_GEOS, lookback_days=LOOKBACK_DAYS,
+                 keywords_per_job=KEYWORDS_PER_JOB, today=None):
+    """
+    Refresh jobs covering the tracked keyword set for the last `lookback_days`.
+
+    Keywords are grouped (first keyword kept in every group as the shared timeline
+    anchor) so one job never grows unbounded.
+    """
+    keywords = list(dict.fromkeys(split_keywords(keywords)))
+    if not keywords:
+        return []
+    geos = split_keywords(geos) or [""]
+    today = today or date.today()
+    start_time, end_time = (today - timedelta(days=lookback_days)).isoformat(), today.isoformat()
+
+    anchor, others = keywords[0], keywords[1:]
+    size = max(keywords_per_job - 1, 1)
+    groups = [[anchor] + others[i:i + size] for i in range(0, len(others), size)] or [[anchor]]
+    return [RefreshJob(tuple(group), geo, start_time, end_time) for geo in geos for group in groups]
+
+
+def make_ingest_runner(db, client, detector=None):
+    """
+    Job runner that ingests a RefreshJob into Supabase and returns the rows written per dataset.
+
+    New timeline points are fed to the spike detector (loaded from disk by default),
+    whose state is saved after every job.
+    """
+    if detector is None:  # SpikeDetector defines __len__, so an empty one is falsy
+        detector = SpikeDetector.load()
+
+    def run(job):
+        written = ingest(db, client, list(job.keywords), [job.geo], [(job.start_time, job.end_time)], job.datasets,
+                         detector=detector)
+        detector.save()
+        return written
+    return run
+
+
+class RefreshScheduler:
+    """
+    Periodic, deduplicating job queue with one background worker.
+
+    - submit() ignores a job that is already queued or running.
+    - start() launches the worker and a ticker that submits `jobs_factory()` every `interval` seconds.
+    - status() reports what ran last, for display on the pages.
+    """
+
+    def __init__(self, run_job, interval=REFRESH_INTERVAL, jobs_factory=tracked_jobs):
+        self.run_job = run_job
+        self.interval = interval
+        self.jobs_factory = jobs_factory
+        self._queue = queue.Queue()
+        self._pending = set()          # queued or running
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self.last_success = {}         # job -> (finished_at, result)
+        self.last_error = {}           # job -> (failed_at, message)
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def submit(self, job):
+        """Queue `job` unless an identical one is pending; return whether it was queued."""
+        with self._lock:
+            if job in self._pending:
+                return False
+            self._pending.add(job)
+        self._queue.put(job)
+        return True
+
+    def submit_tracked(self):
+        """Queue every tracked job; return how many were new."""
+        return sum(self.submit(job) for job in self.jobs_factory())
+
+    def _run(self, job):
+        try:
+            result = self.run_job(job)
+            self.last_success[job] = (time.time(), result)
+            self.last_error.pop(job, None)
+        except Exception as e:  # keep the worker alive whatever one job does
+            logger.exception("Refresh job failed: %s", job)
+            self.last_error[job] = (time.time(), str(e))
+        finally:
+            with self._lock:
+                self._pending.discard(job)
+
+    def run_pending(self):
+        """Run every queued job in the calling thread (used by the CLI's --once)."""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._run(job)
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                job = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            self._run(job)
+
+    def _ticker(self):
+        while not self._stop.is_set():
+            queued = self.submit_tracked()
+            logger.info("Queued %d refresh job(s); next refresh in %.0fs", queued, self.interval)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the worker and ticker threads (no-op if already running)."""
+        if self.running:
+            return self
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._worker, name="trends-refresh-worker", daemon=True),
+            threading.Thread(target=self._ticker, name="trends-refresh-ticker", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def status(self):
+        """Pending job count plus the time and error of the most recent runs."""
+        finished = [finished_at for finished_at, _ in self.last_success.values()]
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "running": self.running,
+            "pending": pending,
+            "last_refresh": max(finished) if finished else None,
+            "errors": {", ".join(job.keywords): message for job, (_, message) in self.last_error.items()},
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the tracked Google Trends keywords into Supabase.")
+    parser.add_argument("--keywords", default=TRACKED_KEYWORDS, help="Comma-separated terms (default: TRENDS_TRACKED_KEYWORDS)")
+    parser.add_argument("--geos", default=TRACKED_GEOS, help="Comma-separated geo codes (default: TRENDS_TRACKED_GEOS)")
+    parser.add_argument("--interval", type=float, default=REFRESH_INTERVAL, help="Seconds between refreshes")
+    parser.add_argument("--lookback-days", type=int, default=LOOKBACK_DAYS)
+    parser.add_argument("--once", action="store_true", help="Run one refresh and exit")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    load_dotenv()
+
+    db = create_pooled_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    client = TrendsClient()
+    scheduler = RefreshScheduler(
+        make_ingest_runner(db, client),
+        interval=args.interval,
+        jobs_factory=lambda: tracked_jobs(args.keywords, args.geos, args.lookback_days),
+    )
+
+    try:
+        if args.once:
+            scheduler.submit_tracked()
+            scheduler.run_pending()
+            return
+        scheduler.start()
+        while scheduler.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import google.generativeai as genai
 from gradio_client import Client
-import requests
+import pandas as pd
 import streamlit as st
-from supabase import create_client
+from llm_cache import LLMCache, prompt_key
+from shared_cache import SharedCache
+from supabase_pool import PooledClient, connection_stats, create_pooled_client
+from table_loader import table_version
+from trends_client import TrendsClient, split_keywords
+from trends_mirror import read_table
+from trends_scheduler import SCHEDULER_ENABLED, RefreshJob, RefreshScheduler, make_ingest_runner
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,22 +21,138 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-# ✅ Initialize Supabase client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 @st.cache_resource
-def get_supabase_db() -> Client:
-    """Initializes and returns a Supabase client."""
+def get_supabase_db() -> PooledClient:
+    """Initializes and returns the process-wide Supabase client (pooled keep-alive connections)."""
     url: str = os.environ.get("SUPABASE_URL") or st.secrets["SUPABASE_URL"]
     key: str = os.environ.get("SUPABASE_KEY") or  st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
+    return create_pooled_client(url, key)
+
+def get_connection_stats():
+    """Supabase HTTP metrics for this process: requests, new connections and reused connections."""
+    return connection_stats.snapshot()
+
+# ✅ Initialize Supabase client (shared by every page and helper)
+supabase = get_supabase_db()
+
+# ✅ Data-version-aware caching for the table loaders
+# A loader cached with st.cache_data takes the table version as its last argument, so
+# new rows (count / max id / max modified changes) produce a new cache entry and
+# load_versioned evicts the entry of the version it replaces. The version itself is a
+# cheap query, re-checked at most every VERSION_CHECK_TTL seconds.
+VERSION_CHECK_TTL = int(os.getenv("VERSION_CHECK_TTL", 60))
+
+@st.cache_data(ttl=VERSION_CHECK_TTL, show_spinner=False)
+def get_table_version(table_name, updated_column=None):
+    """Current (planned row count, max id, max updated) of a table, or None if it cannot be checked."""
+    try:
+        return table_version(get_supabase_db(), table_name, updated_column)
+    except Exception:
+        return None
+
+@st.cache_resource
+def _loaded_versions():
+    """Process-wide (loader, args) -> version currently cached, plus its lock."""
+    return {}, threading.Lock()
+
+def load_versioned(loader, version, *args):
+    """
+    Call the cached `loader(*args, version)`, evicting its entry for the previous version.
+
+    Parameters:
+    - loader: An st.cache_data function whose last parameter is the data version.
+      It should raise on failure (st.cache_data never caches an exception).
+    - version: From get_table_version; None (check failed) keeps serving the cached version.
+    - args: The loader's other arguments, passed positionally.
+
+    The previous entry is only evicted once the new version has loaded; if that load
+    raises, the previous version keeps being served.
+    """
+    versions, lock = _loaded_versions()
+    key = (loader.__module__, loader.__qualname__, args)
+    with lock:
+        previous = versions.get(key)
+    if version is None:
+        version = previous
+
+    try:
+        result = loader(*args, version)
+    except Exception:
+        if previous is None or previous == version:
+            raise
+        return loader(*args, previous)  # still cached: the last good version
+
+    with lock:
+        if previous is not None and previous != version and versions.get(key) == previous:
+            loader.clear(*args, previous)
+        versions[key] = version
+    return result
 
 # Configure the Gemini API key (ensure GEMINI_API_KEY exists in your .env file)
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 model = genai.GenerativeModel('gemini-2.0-flash')
 
-def get_gemini_response(prompt, design_name, target_demographic, category, trend, special_requests=""):
-    """Generate design insights using Gemini."""
+# ✅ Persistent LLM response cache (survives restarts; see llm_cache.py)
+llm_cache = LLMCache.from_env()
+
+# ✅ Cache shared by every Streamlit replica (SQLite file or Redis; see shared_cache.py).
+# Table loaders and Gemini replies go through it so each is computed once per deployment.
+shared_cache = SharedCache.from_env()
+
+def lookup_text(prompt):
+    """Cached Gemini reply for `prompt`: this host's LLM cache first, then the shared cache."""
+    cached = llm_cache.get(model.model_name, prompt)
+    if cached is None:
+        cached = shared_cache.get(prompt_key(model.model_name, prompt))
+        if cached is not None:
+            llm_cache.set(model.model_name, prompt, cached)
+    return cached
+
+def store_text(prompt, text, ttl=None):
+    """Write a Gemini reply to both the LLM cache and the shared cache."""
+    llm_cache.set(model.model_name, prompt, text, ttl=ttl)
+    shared_cache.set(prompt_key(model.model_name, prompt), text, ttl=llm_cache.ttl if ttl is None else ttl)
+
+def generate_text(prompt, ttl=None):
+    """
+    Send a prompt to Gemini through the persistent response cache.
+
+    Every Gemini call site should go through here so repeated prompts are served
+    from disk. Replicas that miss the same prompt at once make a single Gemini call
+    (the shared cache's stampede lock). Errors propagate to the caller and are never cached.
+    """
+    cached = lookup_text(prompt)
+    if cached is not None:
+        return cached
+
+    text = shared_cache.get_or_compute(
+        prompt_key(model.model_name, prompt),
+        lambda: model.generate_content(prompt).text,
+        ttl=llm_cache.ttl if ttl is None else ttl,
+    )
+    llm_cache.set(model.model_name, prompt, text, ttl=ttl)
+    return text
+
+def stream_text(prompt, ttl=None):
+    """
+    Streaming counterpart of generate_text: yields chunks as Gemini produces them.
+
+    A cached response is yielded in one piece. Once the stream finishes, the full
+    text is written to the cache, so later calls (streaming or not) are served from disk.
+    """
+    cached = lookup_text(prompt)
+    if cached is not None:
+        yield cached
+        return
+
+    chunks = []
+    for chunk in model.generate_content(prompt, stream=True):
+        chunks.append(chunk.text)
+        yield chunk.text
+    store_text(prompt, "".join(chunks), ttl=ttl)
+
+def build_response_prompt(prompt, design_name, target_demographic, category, trend, special_requests=""):
+    """Prompt used by get_gemini_response / stream_gemini_response."""
     trend_context = {
         "Natural Ingredients": "Focus on organic and eco-friendly formulations",
         "Sustainable Packaging": "Highlight recyclable and biodegradable materials",
@@ -37,7 +162,7 @@ def get_gemini_response(prompt, design_name, target_demographic, category, trend
         "Gender-Neutral Products": "Design for inclusivity and versatility"
     }.get(trend, "")
     
-    full_prompt = f"""As a hair product designer for Godrej, create insights for {design_name} targeting {target_demographic}:
+    return f"""As a hair product designer for Godrej, create insights for {design_name} targeting {target_demographic}:
 {trend_context}
 Special Requests: {special_requests}
 Focus on:
@@ -45,17 +170,78 @@ Focus on:
 - Packaging design and sustainability
 - Marketing and branding strategies
 {prompt}"""
+
+def get_gemini_response(prompt, design_name, target_demographic, category, trend, special_requests=""):
+    """Generate design insights using Gemini."""
+    full_prompt = build_response_prompt(prompt, design_name, target_demographic, category, trend, special_requests)
     try:
-        response = model.generate_content(full_prompt)
-        return response.text
+        return generate_text(full_prompt)
     except Exception as e:
         return f"Error generating insights: {str(e)}"
 
+def stream_gemini_response(prompt, design_name, target_demographic, category, trend, special_requests=""):
+    """Streaming variant of get_gemini_response: yields text chunks as Gemini produces them."""
+    full_prompt = build_response_prompt(prompt, design_name, target_demographic, category, trend, special_requests)
+    try:
+        yield from stream_text(full_prompt)
+    except Exception as e:
+        yield f"Error generating insights: {str(e)}"
+
+
+
+def run_concurrently(tasks, max_workers=None):
+    """
+    Run independent blocking calls (e.g. Gemini round trips) on a bounded thread pool.
+
+    Parameters:
+    - tasks: A dict of name -> zero-argument callable.
+    - max_workers: Concurrency cap; defaults to one thread per task.
+
+    Returns:
+    - (results, errors): two dicts keyed by task name. A task that raises lands in
+      `errors` and never affects the other tasks.
+    """
+    if not tasks:
+        return {}, {}
+
+    # Worker threads need the Streamlit script context so st.cache_data and
+    # friends behave exactly as they do on the main script thread.
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except ImportError:
+        ctx = None
+
+    def attach_ctx():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    results, errors = {}, {}
+    workers = max(1, min(max_workers or len(tasks), len(tasks)))
+    with ThreadPoolExecutor(max_workers=workers, initializer=attach_ctx) as pool:
+        futures = {name: pool.submit(task) for name, task in tasks.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+    return results, errors
 
 
 # ✅ Load the Gemini model
 # model = genai.GenerativeModel("gemini-pro")
 
+def build_insight_prompt(context, dataset_summary):
+    """Prompt used for a single Google Trends insight (also its cache key)."""
+    return f"""
+    Provide a short, data-driven insight based on Google Trends data.
+    
+    Context: {context}
+    Dataset Summary: {dataset_summary}
+    
+    Keep it concise (a few sentences and under 200 words) and insightful.
+    """
+
 def get_gemini_insight(context, dataset_summary):
     """
     Generate AI insights for Google Trends analysis.
@@ -67,21 +253,102 @@ def get_gemini_insight(context, dataset_summary):
     Returns:
     - A short and insightful AI-generated insight.
     """
-    
+    try:
+        return generate_text(build_insight_prompt(context, dataset_summary)).strip()
+    except Exception as e:
+        return f"⚠️ Error generating insights: {str(e)}"
+
+def stream_gemini_insight(context, dataset_summary):
+    """Streaming variant of get_gemini_insight: yields text chunks for progressive rendering."""
+    try:
+        yield from stream_text(build_insight_prompt(context, dataset_summary))
+    except Exception as e:
+        yield f"⚠️ Error generating insights: {str(e)}"
+
+
+def _parse_batch_insights(reply_text, count):
+    """Parse a batch reply into a list of `count` insights, or None if it is malformed."""
+    try:
+        payload = json.loads(reply_text)
+    except (TypeError, ValueError):
+        return None
+
+    entries = payload.get("insights") if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return None
+
+    insights = [None] * count
+    for entry in entries:
+        if not isinstance(entry, dict):
+            return None
+        idx, text = entry.get("id"), entry.get("insight")
+        if not isinstance(idx, int) or not 0 <= idx < count or not isinstance(text, str) or not text.strip():
+            return None
+        insights[idx] = text.strip()
+
+    return None if any(text is None for text in insights) else insights
+
+
+def _generate_insight_batch(pairs):
+    """One structured-output round trip for `pairs`; splits the batch in half if the reply is malformed."""
+    if len(pairs) == 1:
+        return [get_gemini_insight(*pairs[0])]
+
+    items = "\n".join(
+        f"{idx}. Context: {context}\n   Dataset Summary: {summary}"
+        for idx, (context, summary) in enumerate(pairs)
+    )
     prompt = f"""
-    Provide a short, data-driven insight based on Google Trends data.
-    
-    Context: {context}
-    Dataset Summary: {dataset_summary}
-    
-    Keep it concise (a few sentences and under 200 words) and insightful.
+    Provide a short, data-driven insight based on Google Trends data for each numbered item below.
+    Keep each insight concise (a few sentences and under 200 words) and insightful.
+
+    {items}
+
+    Reply with JSON only, in the form {{"insights": [{{"id": <item number>, "insight": "<text>"}}]}},
+    with exactly one entry per item.
     """
-    
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        response = model.generate_content(
+            prompt, generation_config={"response_mime_type": "application/json"}
+        )
+        insights = _parse_batch_insights(response.text, len(pairs))
     except Exception as e:
-        return f"⚠️ Error generating insights: {str(e)}"
+        return [f"⚠️ Error generating insights: {str(e)}"] * len(pairs)
+
+    if insights is None:
+        # Malformed reply: retry each half separately
+        mid = len(pairs) // 2
+        return _generate_insight_batch(pairs[:mid]) + _generate_insight_batch(pairs[mid:])
+
+    # Cache each insight under its single-insight prompt so get_gemini_insight reuses it too
+    for (context, summary), text in zip(pairs, insights):
+        store_text(build_insight_prompt(context, summary), text)
+    return insights
+
+
+def get_gemini_insights(pairs):
+    """
+    Generate several Google Trends insights with a single Gemini request.
+
+    Parameters:
+    - pairs: A list of (context, dataset_summary) tuples, as passed to get_gemini_insight.
+
+    Returns:
+    - A dict of context -> insight. Cached insights are reused and only the
+      remaining ones are sent, together, in one structured-output request.
+    """
+    insights, pending = {}, []
+    for context, summary in pairs:
+        cached = lookup_text(build_insight_prompt(context, summary))
+        if cached is not None:
+            insights[context] = cached.strip()
+        else:
+            pending.append((context, summary))
+
+    if pending:
+        for (context, _), text in zip(pending, _generate_insight_batch(pending)):
+            insights[context] = text
+    return insights
 
 
 
@@ -102,53 +369,50 @@ def generate_image(prompt_text):
     except Exception as e:
         return None
 
+# ✅ Shared Google Trends fetcher (pooled session, timeouts, retries, rate limit; see trends_client.py).
+# Only the background scheduler uses it: pages read the refreshed tables instead of calling Google.
+trends_client = TrendsClient()
+
+@st.cache_resource
+def get_trends_scheduler() -> RefreshScheduler:
+    """Process-wide Trends refresh scheduler; its threads only start when TRENDS_SCHEDULER_ENABLED is set."""
+    scheduler = RefreshScheduler(make_ingest_runner(get_supabase_db(), trends_client))
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    return scheduler
+
+trends_scheduler = get_trends_scheduler()
+
 def fetch_google_trends_data(keywords, start_time, end_time, geo=""):
     """
-    Fetches Google Trends data using the provided parameters.
-    """
-    # Construct the request payload
-    url = "https://trends.google.com/trends/api/widgetdata/multiline"
-    params = {
-        "hl": "en-GB",
-        "tz": "-120",
-        "req": {
-            "time": f"{start_time} {end_time}",
-            "resolution": "EIGHT_MINUTE",
-            "locale": "en-GB",
-            "comparisonItem": [
-                {
-                    "geo": {"country": geo} if geo else {},
-                    "complexKeywordsRestriction": {
-                        "keyword": [{"type": "BROAD", "value": keyword.strip()} for keyword in keywords.split(",")]
-                    }
-                }
-            ],
-            "requestOptions": {"property": "", "backend": "CM", "category": 146},
-            "userConfig": {"userType": "USER_TYPE_LEGIT_USER"},
-        },
-        "token": "APP6_UEAAAAAZ6Hj7x8eBzGqYkg6FHp6gSFeZVkcC-73",
-        "tz": "-120",
-    }
-
-    headers = {
-        "accept": "application/json, text/plain, */*",
-        "accept-language": "en-US,en;q=0.9",
-        "cache-control": "no-cache",
-        "pragma": "no-cache",
-        "referer": "https://trends.google.com/trends/explore?cat=146&date=now%201-d&q=braids&hl=en-GB",
-        "sec-fetch-dest": "empty",
-        "sec-fetch-mode": "cors",
-        "sec-fetch-site": "same-origin",
-        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-    }
+    Returns the last refreshed Google Trends interest over time for the keywords; never calls Google.
+
+    Reads the mirrored multitimeline table and, when the scheduler is running, queues a
+    (deduplicated) refresh of the combination for next time. Returns a time-indexed
+    DataFrame with one column per keyword that has data, or {"error": ...} if the
+    mirror cannot be read.
+    """
+    keywords = split_keywords(keywords)
+    if trends_scheduler.running:
+        trends_scheduler.submit(RefreshJob(tuple(keywords), geo, str(start_time), str(end_time)))
 
     try:
-        # Send the request
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        df = read_table("brd_gtrends_multitimeline")
+    except (OSError, ValueError) as e:
         return {"error": str(e)}
+    if df.empty:
+        return pd.DataFrame()
+
+    df = df[df["keyword"].isin(keywords)]
+    if "geo" in df.columns:
+        df = df[df["geo"] == geo]
+    times = pd.to_datetime(df["time"], utc=True, errors="coerce", format="ISO8601")
+    start = pd.Timestamp(str(start_time).replace("\\", ""), tz="UTC")
+    end = pd.Timestamp(str(end_time).replace("\\", ""), tz="UTC")
+    if end == end.normalize():
+        end += pd.Timedelta(days=1)  # a bare end date includes that whole day
+    df = df.assign(time=times)[(times >= start) & (times < end)]
+    return df.pivot_table(index="time", columns="keyword", values="interest", aggfunc="last", observed=True)
 
 
 
@@ -224,3 +488,26 @@ def display_ai_insight(insight_text, title):
         if st.button(f"➕", help=tooltip, key=f"btn_{title}"):  # Unique key per button
             save_to_designer(insight_text)  # Save to DB when clicked
 
+# ✅ Streaming version of display_ai_insight
+def display_ai_insight_stream(chunks, title):
+    """Render an AI insight progressively as chunks arrive, with a button to save to designer.
+
+    Returns the full insight text once the stream is complete.
+    """
+    col1, col2 = st.columns([5, 1])  # Adjust layout for button placement
+
+    with col1:
+        placeholder = st.empty()
+        insight_text = ""
+        for chunk in chunks:
+            insight_text += chunk
+            placeholder.info(insight_text)  # Re-render with the text received so far
+        insight_text = insight_text.strip()
+        placeholder.info(insight_text)
+
+    with col2:
+        tooltip = "Add this insight to the designer for later use"
+        if st.button(f"➕", help=tooltip, key=f"btn_{title}"):  # Unique key per button
+            save_to_designer(insight_text)  # Save to DB when clicked
+
+    return insight_text